@@ -2,12 +2,102 @@
 """
 Test which Bedrock models are available in your region
 """
-import boto3
 import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from botocore.exceptions import ClientError
+# Make the shared AWS clients in src/ importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from aws_clients import client
 
-def test_bedrock_models(region='eu-central-1'):
-    """Test available Bedrock models."""
-    bedrock = boto3.client('bedrock-runtime', region_name=region)
+# Resolve credentials against the regional STS endpoint, not global us-east-1
+os.environ.setdefault('AWS_STS_REGIONAL_ENDPOINTS', 'regional')
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    _encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+    
+    def _dumps(obj):
+        return _encode(obj).encode('utf-8')
+
+# Claude messages body with the user text as the only variable part
+_CLAUDE_TMPL = (b'{"anthropic_version":"bedrock-2023-05-31","max_tokens":10,'
+                b'"messages":[{"role":"user","content":%b}]}')
+
+def _claude_body(user_text):
+    """Fill the Claude template, JSON-escaping only the user text."""
+    return _CLAUDE_TMPL % _dumps(user_text)
+
+# Minimal "Hi" request payload per provider prefix of the model ID
+_HI_PAYLOADS = {
+    'openai': {'prompt': 'Hi', 'max_tokens': 10},
+    'amazon': {'inputText': 'Hi', 'textGenerationConfig': {'maxTokenCount': 10}},
+    'ai21': {'prompt': 'Hi', 'maxTokens': 10},
+    'meta': {'prompt': 'Hi', 'max_gen_len': 10},
+    'cohere': {'prompt': 'Hi', 'max_tokens': 10},
+}
+
+# Serialized once at import; invoke_model accepts the bytes as-is
+_HI = {provider: _dumps(payload) for provider, payload in _HI_PAYLOADS.items()}
+_HI['anthropic'] = _claude_body('Hi')
+
+def _probe_model(bedrock, model_id, model_name):
+    """Invoke a single model with a tiny prompt and report whether it answered."""
+    try:
+        # Try a simple test prompt in the provider's request format
+        body = _HI.get(model_id.split('.', 1)[0])
+        if body is None:
+            return model_id, model_name, False, f"❌ {model_name}: ERROR - unknown provider"
+        
+        bedrock.invoke_model(
+            modelId=model_id,
+            body=body
+        )
+        
+        return model_id, model_name, True, f"✅ {model_name}: AVAILABLE"
+        
+    except bedrock.exceptions.ValidationException:
+        line = f"❌ {model_name}: NOT AVAILABLE (not enabled)"
+    except bedrock.exceptions.AccessDeniedException:
+        line = f"⚠️  {model_name}: ACCESS DENIED (check IAM permissions)"
+    except ClientError as e:
+        line = f"❌ {model_name}: ERROR - {e.response['Error']['Code']}"
+    except Exception as e:
+        line = f"❌ {model_name}: ERROR - {str(e)[:50]}"
+    return model_id, model_name, False, line
+
+@lru_cache(maxsize=None)
+def _list_active_models(region):
+    """Return the IDs of all ACTIVE foundation models in one control-plane call.
+    
+    The listing is cached per region for the life of the process.
+    """
+    summaries = client('bedrock', region).list_foundation_models()['modelSummaries']
+    return frozenset(
+        m['modelId'] for m in summaries
+        if m.get('modelLifecycle', {}).get('status') == 'ACTIVE'
+    )
+
+def _probe_models(region, test_models):
+    """Invoke every model concurrently to verify access end to end."""
+    bedrock = client('bedrock-runtime', region)
+    
+    # Probes are network-bound, so fan them out; the client is thread-safe
+    workers = min(len(test_models), (os.cpu_count() or 1) * 5)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda m: _probe_model(bedrock, *m), test_models))
+
+def test_bedrock_models(region='eu-central-1', deep=False):
+    """Test available Bedrock models.
+    
+    By default a single list_foundation_models call filters out models that
+    are not ACTIVE and only the rest are invoked. With deep=True every model
+    is invoked, skipping the listing.
+    """
     
     # Models to test
     test_models = [
@@ -28,57 +118,28 @@ def test_bedrock_models(region='eu-central-1'):
     print(f"Testing Bedrock Models in {region}...\n")
     available_models = []
     
-    for model_id, model_name in test_models:
+    # ACTIVE in the listing only means the region offers the model; access is
+    # confirmed by invoking it, so the listing just narrows what gets probed
+    to_probe = test_models
+    if not deep:
         try:
-            # Try a simple test prompt
-            if 'openai' in model_id:
-                body = json.dumps({
-                    'prompt': 'Hi',
-                    'max_tokens': 10
-                })
-            elif 'claude' in model_id:
-                body = json.dumps({
-                    'anthropic_version': 'bedrock-2023-05-31',
-                    'max_tokens': 10,
-                    'messages': [{'role': 'user', 'content': 'Hi'}]
-                })
-            elif 'titan' in model_id:
-                body = json.dumps({
-                    'inputText': 'Hi',
-                    'textGenerationConfig': {'maxTokenCount': 10}
-                })
-            elif 'ai21' in model_id:
-                body = json.dumps({
-                    'prompt': 'Hi',
-                    'maxTokens': 10
-                })
-            elif 'llama' in model_id:
-                body = json.dumps({
-                    'prompt': 'Hi',
-                    'max_gen_len': 10
-                })
-            elif 'cohere' in model_id:
-                body = json.dumps({
-                    'prompt': 'Hi',
-                    'max_tokens': 10
-                })
-            
-            response = bedrock.invoke_model(
-                modelId=model_id,
-                body=body
-            )
-            
-            print(f"✅ {model_name}: AVAILABLE")
-            available_models.append((model_id, model_name))
-            
+            enabled = _list_active_models(region)
+            to_probe = [m for m in test_models if m[0] in enabled]
         except Exception as e:
-            error_msg = str(e)
-            if 'ValidationException' in error_msg:
-                print(f"❌ {model_name}: NOT AVAILABLE (not enabled)")
-            elif 'AccessDeniedException' in error_msg:
-                print(f"⚠️  {model_name}: ACCESS DENIED (check IAM permissions)")
-            else:
-                print(f"❌ {model_name}: ERROR - {error_msg[:50]}")
+            print(f"⚠️  Model listing failed ({e}), probing models directly\n")
+    
+    probed = {result[0]: result for result in _probe_models(region, to_probe)} if to_probe else {}
+    results = [
+        probed.get(model_id) or
+        (model_id, model_name, False, f"❌ {model_name}: NOT AVAILABLE (not ACTIVE in {region})")
+        for model_id, model_name in test_models
+    ]
+    
+    # Print in the original order once every probe has finished
+    for model_id, model_name, ok, line in results:
+        print(line)
+        if ok:
+            available_models.append((model_id, model_name))
     
     print(f"\n{'='*60}")
     print(f"Summary: {len(available_models)}/{len(test_models)} models available")
@@ -91,10 +152,11 @@ def test_bedrock_models(region='eu-central-1'):
     else:
         print("\n⚠️  No models available. Check:")
         print("  1. AWS credentials configured")
-        print("  2. IAM permissions for bedrock:InvokeModel")
+        print("  2. IAM permissions for bedrock:InvokeModel / bedrock:ListFoundationModels")
         print("  3. Region supports Bedrock (eu-central-1)")
 
 if __name__ == '__main__':
     import sys
-    region = sys.argv[1] if len(sys.argv) > 1 else 'eu-central-1'
-    test_bedrock_models(region)
+    args = [a for a in sys.argv[1:] if a != '--deep']
+    region = args[0] if args else 'eu-central-1'
+    test_bedrock_models(region, deep='--deep' in sys.argv[1:])
@@ -12,10 +12,25 @@ __version__ = "1.0.0"
 __author__ = "QuantumViz Team"
 __email__ = "team@quantumviz.ai"
 
-# Package imports
-from .agent import QuantumVizAgent
-from .quantum import CircuitProcessor, BraketConnector
-from .visualization import VisualizationEngine
+import importlib
+
+# Package imports are resolved lazily (PEP 562) so that importing a single
+# submodule does not pull in boto3, Braket and the visualization stack.
+_LAZY = {
+    "QuantumVizAgent": (".agent", "QuantumVizAgent"),
+    "CircuitProcessor": (".quantum", "CircuitProcessor"),
+    "BraketConnector": (".quantum", "BraketConnector"),
+    "VisualizationEngine": (".visualization", "VisualizationEngine"),
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module, attr = _LAZY[name]
+        obj = getattr(importlib.import_module(module, __name__), attr)
+        globals()[name] = obj
+        return obj
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     "QuantumVizAgent",
@@ -4,10 +4,13 @@ QuantumViz Agent - Accessibility & Localization Features
 Accessibility support and Arabic localization for inclusive quantum learning.
 """
 
+import io
 import json
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from typing import Dict, Any, Mapping, Optional, Tuple
+from dataclasses import dataclass, replace
 from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
 
 class AccessibilityLevel(Enum):
     BASIC = "basic"
@@ -20,7 +23,7 @@ class Language(Enum):
     SPANISH = "es"
     FRENCH = "fr"
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AccessibilitySettings:
     screen_reader: bool
     high_contrast: bool
@@ -30,12 +33,150 @@ class AccessibilitySettings:
     audio_descriptions: bool
     color_blind_friendly: bool
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class LocalizationContent:
     language: Language
-    content: Dict[str, str]
+    content: Mapping[str, str]
     rtl_support: bool
-    cultural_adaptations: Dict[str, Any]
+    cultural_adaptations: Mapping[str, Any]
+
+def _freeze(value: Any) -> Any:
+    """Recursively wrap dicts in read-only views and turn lists into tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+# Static content shared by every AccessibilityManager, built once at import
+_DEFAULT_SETTINGS = AccessibilitySettings(
+    screen_reader=True,
+    high_contrast=False,
+    large_text=False,
+    keyboard_navigation=True,
+    voice_commands=False,
+    audio_descriptions=False,
+    color_blind_friendly=True
+)
+
+_LOCALIZATION_CONTENT = MappingProxyType({
+    Language.ENGLISH: LocalizationContent(
+        language=Language.ENGLISH,
+        content=_freeze({
+            "quantum_superposition": "Quantum Superposition",
+            "quantum_entanglement": "Quantum Entanglement",
+            "bell_state": "Bell State",
+            "hadamard_gate": "Hadamard Gate",
+            "cnot_gate": "CNOT Gate",
+            "measurement": "Measurement",
+            "circuit": "Circuit",
+            "qubit": "Qubit",
+            "gate": "Gate",
+            "entanglement": "Entanglement"
+        }),
+        rtl_support=False,
+        cultural_adaptations=_freeze({})
+    ),
+    Language.ARABIC: LocalizationContent(
+        language=Language.ARABIC,
+        content=_freeze({
+            "quantum_superposition": "التراكب الكمي",
+            "quantum_entanglement": "التشابك الكمي",
+            "bell_state": "حالة بيل",
+            "hadamard_gate": "بوابة هادامارد",
+            "cnot_gate": "بوابة CNOT",
+            "measurement": "القياس",
+            "circuit": "الدائرة",
+            "qubit": "البت الكمي",
+            "gate": "البوابة",
+            "entanglement": "التشابك"
+        }),
+        rtl_support=True,
+        cultural_adaptations=_freeze({
+            "number_format": "arabic",
+            "date_format": "hijri",
+            "cultural_context": "islamic_science"
+        })
+    )
+})
+
+_VOICE_COMMANDS = _freeze({
+    "navigation": [
+        "go to circuit builder",
+        "open quantum algorithms",
+        "show visualizations",
+        "access help",
+        "go back",
+        "next step",
+        "previous step"
+    ],
+    "quantum_operations": [
+        "add hadamard gate",
+        "add cnot gate",
+        "measure qubit",
+        "run simulation",
+        "create bell state",
+        "show entanglement"
+    ],
+    "learning": [
+        "explain superposition",
+        "what is entanglement",
+        "show example",
+        "give hint",
+        "check answer",
+        "next lesson"
+    ]
+})
+
+_ARABIC_EDU = _freeze({
+    "introduction": {
+        "title": "مرحباً بك في عالم الحوسبة الكمية",
+        "subtitle": "اكتشف قوة الميكانيكا الكمية في الحوسبة",
+        "cultural_context": "بناءً على التراث الإسلامي في العلوم والرياضيات"
+    },
+    "concepts": {
+        "superposition": {
+            "arabic": "التراكب الكمي",
+            "explanation": "التراكب الكمي هو المبدأ الأساسي الذي يسمح للجسيمات الكمية بالوجود في حالات متعددة في نفس الوقت",
+            "cultural_analogy": "مثل القمر الذي يمكن رؤيته في أماكن مختلفة في نفس الوقت",
+            "mathematical": "|ψ⟩ = α|0⟩ + β|1⟩ حيث |α|² + |β|² = 1"
+        },
+        "entanglement": {
+            "arabic": "التشابك الكمي",
+            "explanation": "التشابك الكمي هو ظاهرة تربط الجسيمات الكمية ببعضها البعض",
+            "cultural_analogy": "مثل التوائم الذين يشعرون ببعضهم البعض من مسافة بعيدة",
+            "mathematical": "|Φ⁺⟩ = (|00⟩ + |11⟩)/√2"
+        }
+    },
+    "learning_path": [
+        "مقدمة في الميكانيكا الكمية",
+        "التراكب الكمي",
+        "التشابك الكمي",
+        "حالات بيل",
+        "خوارزميات كمية",
+        "التطبيقات العملية"
+    ],
+    "cultural_notes": {
+        "historical_context": "العلماء المسلمون مثل الخوارزمي والبيروني أسسوا أسس الرياضيات والعلوم",
+        "modern_relevance": "الحوسبة الكمية هي الخطوة التالية في تطور الحوسبة",
+        "educational_approach": "دمج المفاهيم الكمية مع التراث العلمي الإسلامي"
+    }
+})
+
+# Audio description formatters keyed by visualization type
+_AUDIO_FORMATTERS = {
+    "bloch_sphere": lambda data: (
+        f"Bloch sphere showing qubit state with coordinates "
+        f"x={data.get('x', 0):.2f}, y={data.get('y', 0):.2f}, z={data.get('z', 0):.2f}"
+    ),
+    "circuit": lambda data: f"Quantum circuit diagram with {len(data.get('gates', ()))} gates",
+    "entanglement": lambda data: "Entanglement visualization showing correlation between qubits",
+}
+
+@lru_cache(maxsize=4096)
+def _lookup_localized(language: Language, concept: str) -> str:
+    """Cached concept lookup; safe because the localization tables are read-only."""
+    return _LOCALIZATION_CONTENT[language].content.get(concept, concept)
 
 class AccessibilityManager:
     """Manages accessibility features and localization."""
@@ -47,88 +188,20 @@ class AccessibilityManager:
         
     def _default_accessibility_settings(self) -> AccessibilitySettings:
         """Initialize default accessibility settings."""
-        return AccessibilitySettings(
-            screen_reader=True,
-            high_contrast=False,
-            large_text=False,
-            keyboard_navigation=True,
-            voice_commands=False,
-            audio_descriptions=False,
-            color_blind_friendly=True
-        )
+        return _DEFAULT_SETTINGS
     
-    def _initialize_localization_content(self) -> Dict[Language, LocalizationContent]:
+    def update_accessibility_settings(self, **changes: bool) -> AccessibilitySettings:
+        """Replace the (immutable) settings with a copy that applies the given changes."""
+        self.accessibility_settings = replace(self.accessibility_settings, **changes)
+        return self.accessibility_settings
+    
+    def _initialize_localization_content(self) -> Mapping[Language, LocalizationContent]:
         """Initialize localization content for different languages."""
-        return {
-            Language.ENGLISH: LocalizationContent(
-                language=Language.ENGLISH,
-                content={
-                    "quantum_superposition": "Quantum Superposition",
-                    "quantum_entanglement": "Quantum Entanglement",
-                    "bell_state": "Bell State",
-                    "hadamard_gate": "Hadamard Gate",
-                    "cnot_gate": "CNOT Gate",
-                    "measurement": "Measurement",
-                    "circuit": "Circuit",
-                    "qubit": "Qubit",
-                    "gate": "Gate",
-                    "entanglement": "Entanglement"
-                },
-                rtl_support=False,
-                cultural_adaptations={}
-            ),
-            Language.ARABIC: LocalizationContent(
-                language=Language.ARABIC,
-                content={
-                    "quantum_superposition": "التراكب الكمي",
-                    "quantum_entanglement": "التشابك الكمي",
-                    "bell_state": "حالة بيل",
-                    "hadamard_gate": "بوابة هادامارد",
-                    "cnot_gate": "بوابة CNOT",
-                    "measurement": "القياس",
-                    "circuit": "الدائرة",
-                    "qubit": "البت الكمي",
-                    "gate": "البوابة",
-                    "entanglement": "التشابك"
-                },
-                rtl_support=True,
-                cultural_adaptations={
-                    "number_format": "arabic",
-                    "date_format": "hijri",
-                    "cultural_context": "islamic_science"
-                }
-            )
-        }
+        return _LOCALIZATION_CONTENT
     
-    def _initialize_voice_commands(self) -> Dict[str, List[str]]:
+    def _initialize_voice_commands(self) -> Mapping[str, Tuple[str, ...]]:
         """Initialize voice commands for accessibility."""
-        return {
-            "navigation": [
-                "go to circuit builder",
-                "open quantum algorithms",
-                "show visualizations",
-                "access help",
-                "go back",
-                "next step",
-                "previous step"
-            ],
-            "quantum_operations": [
-                "add hadamard gate",
-                "add cnot gate",
-                "measure qubit",
-                "run simulation",
-                "create bell state",
-                "show entanglement"
-            ],
-            "learning": [
-                "explain superposition",
-                "what is entanglement",
-                "show example",
-                "give hint",
-                "check answer",
-                "next lesson"
-            ]
-        }
+        return _VOICE_COMMANDS
     
     def get_accessibility_features(self) -> Dict[str, Any]:
         """Get available accessibility features."""
@@ -176,79 +249,40 @@ class AccessibilityManager:
     
     def get_localized_content(self, language: Language, concept: str) -> str:
         """Get localized content for a quantum concept."""
-        if language not in self.localization_content:
+        if language not in _LOCALIZATION_CONTENT:
             language = Language.ENGLISH
         
-        content = self.localization_content[language]
-        return content.content.get(concept, concept)
+        return _lookup_localized(language, concept)
     
-    def get_arabic_quantum_education(self) -> Dict[str, Any]:
+    def get_arabic_quantum_education(self) -> Mapping[str, Any]:
         """Get Arabic quantum education content with cultural context."""
-        return {
-            "introduction": {
-                "title": "مرحباً بك في عالم الحوسبة الكمية",
-                "subtitle": "اكتشف قوة الميكانيكا الكمية في الحوسبة",
-                "cultural_context": "بناءً على التراث الإسلامي في العلوم والرياضيات"
-            },
-            "concepts": {
-                "superposition": {
-                    "arabic": "التراكب الكمي",
-                    "explanation": "التراكب الكمي هو المبدأ الأساسي الذي يسمح للجسيمات الكمية بالوجود في حالات متعددة في نفس الوقت",
-                    "cultural_analogy": "مثل القمر الذي يمكن رؤيته في أماكن مختلفة في نفس الوقت",
-                    "mathematical": "|ψ⟩ = α|0⟩ + β|1⟩ حيث |α|² + |β|² = 1"
-                },
-                "entanglement": {
-                    "arabic": "التشابك الكمي",
-                    "explanation": "التشابك الكمي هو ظاهرة تربط الجسيمات الكمية ببعضها البعض",
-                    "cultural_analogy": "مثل التوائم الذين يشعرون ببعضهم البعض من مسافة بعيدة",
-                    "mathematical": "|Φ⁺⟩ = (|00⟩ + |11⟩)/√2"
-                }
-            },
-            "learning_path": [
-                "مقدمة في الميكانيكا الكمية",
-                "التراكب الكمي",
-                "التشابك الكمي",
-                "حالات بيل",
-                "خوارزميات كمية",
-                "التطبيقات العملية"
-            ],
-            "cultural_notes": {
-                "historical_context": "العلماء المسلمون مثل الخوارزمي والبيروني أسسوا أسس الرياضيات والعلوم",
-                "modern_relevance": "الحوسبة الكمية هي الخطوة التالية في تطور الحوسبة",
-                "educational_approach": "دمج المفاهيم الكمية مع التراث العلمي الإسلامي"
-            }
-        }
+        return _ARABIC_EDU
     
     def generate_accessible_circuit_description(self, circuit: Dict[str, Any]) -> str:
         """Generate accessible description of quantum circuit."""
         gates = circuit.get("gates", [])
-        description_parts = []
+        buf = io.StringIO()
         
-        description_parts.append("Quantum circuit with the following gates:")
+        buf.write("Quantum circuit with the following gates:")
         
         for i, gate in enumerate(gates):
             gate_type = gate.get("type", "")
             qubit = gate.get("qubit", 0)
             target = gate.get("target")
             
-            gate_description = f"Gate {i+1}: {gate_type} on qubit {qubit}"
+            buf.write(f". Gate {i+1}: {gate_type} on qubit {qubit}")
             if target is not None:
-                gate_description += f" targeting qubit {target}"
-            
-            description_parts.append(gate_description)
+                buf.write(f" targeting qubit {target}")
         
-        return ". ".join(description_parts) + "."
+        buf.write(".")
+        return buf.getvalue()
     
     def generate_audio_description(self, visualization_type: str, data: Dict[str, Any]) -> str:
         """Generate audio description for quantum visualizations."""
-        if visualization_type == "bloch_sphere":
-            return f"Bloch sphere showing qubit state with coordinates x={data.get('x', 0):.2f}, y={data.get('y', 0):.2f}, z={data.get('z', 0):.2f}"
-        elif visualization_type == "circuit":
-            return f"Quantum circuit diagram with {len(data.get('gates', []))} gates"
-        elif visualization_type == "entanglement":
-            return f"Entanglement visualization showing correlation between qubits"
-        else:
+        formatter = _AUDIO_FORMATTERS.get(visualization_type)
+        if formatter is None:
             return f"Quantum visualization of type {visualization_type}"
+        return formatter(data)
     
     def get_keyboard_shortcuts(self) -> Dict[str, str]:
         """Get keyboard shortcuts for accessibility."""
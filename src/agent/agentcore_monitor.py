@@ -4,67 +4,77 @@ QuantumViz Agent - AgentCore Status Monitor
 Monitor AgentCore agent status and test when ready.
 """
 
-import boto3
-import json
+import asyncio
+import os
+import sys
 import time
+from functools import partial
 
-def check_agent_status():
-    """Check the status of our AgentCore agent."""
-    print("🔍 Checking AgentCore agent status...")
-    
+# Resolve credentials against the regional STS endpoint, not global us-east-1
+os.environ.setdefault('AWS_STS_REGIONAL_ENDPOINTS', 'regional')
+
+AGENT_REGION = 'eu-central-1'
+
+# Add parent directory to path to import the shared AWS clients
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aws_clients import aio_client, client
+
+async def _status_snapshot():
+    """Fetch agent details, versions and aliases in about one round-trip."""
     try:
-        agentcore = boto3.client('bedrock-agent', region_name='eu-central-1')
-        
-        # Get agent details
-        response = agentcore.get_agent(agentId='DRC1I6SIWE')
-        agent = response['agent']
-        
-        print(f"✅ Agent Status:")
-        print(f"   Name: {agent['agentName']}")
-        print(f"   Status: {agent['agentStatus']}")
-        print(f"   Model: {agent['foundationModel']}")
-        print(f"   Created: {agent['createdAt']}")
-        
-        if 'updatedAt' in agent:
-            print(f"   Updated: {agent['updatedAt']}")
-        
-        return agent['agentStatus']
-        
-    except Exception as e:
-        print(f"❌ Agent status check error: {e}")
-        return None
+        import aioboto3
+    except ImportError:
+        # Fall back to the blocking client on the default thread pool
+        loop = asyncio.get_running_loop()
+        agentcore = client('bedrock-agent', AGENT_REGION)
+        return await asyncio.gather(
+            loop.run_in_executor(None, partial(agentcore.get_agent, agentId='DRC1I6SIWE')),
+            loop.run_in_executor(None, partial(agentcore.list_agent_versions, agentId='DRC1I6SIWE')),
+            loop.run_in_executor(None, partial(agentcore.list_agent_aliases, agentId='DRC1I6SIWE')),
+        )
+    
+    session = aioboto3.Session()
+    async with aio_client(session, 'bedrock-agent', AGENT_REGION) as agentcore:
+        return await asyncio.gather(
+            agentcore.get_agent(agentId='DRC1I6SIWE'),
+            agentcore.list_agent_versions(agentId='DRC1I6SIWE'),
+            agentcore.list_agent_aliases(agentId='DRC1I6SIWE'),
+        )
+
+def status_snapshot():
+    """Return (agent, versions, aliases) fetched concurrently."""
+    agent, versions, aliases = asyncio.run(_status_snapshot())
+    return agent['agent'], versions['agentVersionSummaries'], aliases['agentAliasSummaries']
 
-def list_agent_versions():
-    """List agent versions and their status."""
-    print("\n📋 Checking agent versions...")
+def _print_agent(agent):
+    """Print the interesting fields of a get_agent response."""
+    print(f"✅ Agent Status:")
+    print(f"   Name: {agent['agentName']}")
+    print(f"   Status: {agent['agentStatus']}")
+    print(f"   Model: {agent['foundationModel']}")
+    print(f"   Created: {agent['createdAt']}")
     
-    try:
-        agentcore = boto3.client('bedrock-agent', region_name='eu-central-1')
-        
-        response = agentcore.list_agent_versions(agentId='DRC1I6SIWE')
-        versions = response['agentVersionSummaries']
-        
-        print(f"✅ Found {len(versions)} agent versions:")
-        
-        for version in versions:
-            print(f"   • Version {version['agentVersion']}: {version['agentStatus']}")
-            print(f"     Created: {version['createdAt']}")
-        
-        return versions
-        
-    except Exception as e:
-        print(f"❌ Version list error: {e}")
-        return []
+    if 'updatedAt' in agent:
+        print(f"   Updated: {agent['updatedAt']}")
+
+def _print_versions(versions):
+    """Print a list_agent_versions summary."""
+    print(f"✅ Found {len(versions)} agent versions:")
+    
+    for version in versions:
+        print(f"   • Version {version['agentVersion']}: {version['agentStatus']}")
+        print(f"     Created: {version['createdAt']}")
 
-def create_agent_alias_if_ready():
-    """Create agent alias if agent is ready."""
+def create_agent_alias_if_ready(agent_status):
+    """Create agent alias if agent is ready.
+    
+    Takes the status already fetched by the status snapshot so the agent
+    is not queried a second time.
+    """
     print("\n🏷️  Checking if agent alias can be created...")
     
     try:
-        agentcore = boto3.client('bedrock-agent', region_name='eu-central-1')
-        
-        # Check if agent is ready
-        agent_status = check_agent_status()
+        agentcore = client('bedrock-agent', AGENT_REGION)
         
         if agent_status == 'PREPARED':
             print("✅ Agent is ready! Creating alias...")
@@ -93,33 +103,42 @@ def create_agent_alias_if_ready():
             print(f"❌ Alias creation error: {e}")
             return None
 
-def test_agent_invocation():
-    """Test agent invocation if ready."""
+def test_agent_invocation(alias_id=None, aliases=None):
+    """Test agent invocation if ready.
+    
+    Uses the alias ID returned by create_agent_alias_if_ready() when known and
+    only looks at aliases when it is missing or the alias already existed.
+    Pass aliases from status_snapshot() to skip listing them again.
+    """
     print("\n🧪 Testing agent invocation...")
     
     try:
-        # Check if we have an alias
-        agentcore = boto3.client('bedrock-agent', region_name='eu-central-1')
-        
-        # List aliases
-        aliases_response = agentcore.list_agent_aliases(agentId='DRC1I6SIWE')
-        aliases = aliases_response['agentAliasSummaries']
-        
-        if not aliases:
-            print("❌ No aliases found. Agent may not be ready yet.")
-            return False
-        
-        alias = aliases[0]
-        print(f"✅ Using alias: {alias['agentAliasName']} ({alias['agentAliasId']})")
+        if alias_id in (None, "EXISTS"):
+            # Look up an existing alias
+            if aliases is None:
+                agentcore = client('bedrock-agent', AGENT_REGION)
+                
+                aliases_response = agentcore.list_agent_aliases(agentId='DRC1I6SIWE')
+                aliases = aliases_response['agentAliasSummaries']
+            
+            if not aliases:
+                print("❌ No aliases found. Agent may not be ready yet.")
+                return False
+            
+            alias = aliases[0]
+            alias_id = alias['agentAliasId']
+            print(f"✅ Using alias: {alias['agentAliasName']} ({alias_id})")
+        else:
+            print(f"✅ Using alias: {alias_id}")
         
         # Test invocation
-        runtime = boto3.client('bedrock-agent-runtime', region_name='eu-central-1')
+        runtime = client('bedrock-agent-runtime', AGENT_REGION)
         
         test_prompt = "Hello! Can you explain what quantum entanglement is?"
         
         response = runtime.invoke_agent(
             agentId='DRC1I6SIWE',
-            agentAliasId=alias['agentAliasId'],
+            agentAliasId=alias_id,
             sessionId='test-session-001',
             inputText=test_prompt
         )
@@ -127,13 +146,13 @@ def test_agent_invocation():
         print("✅ Agent invocation successful!")
         print(f"   Session: {response['sessionId']}")
         
-        # Read the response
+        # Read the response, decoding the collected chunks in one pass
+        buf = bytearray()
         for event in response['completion']:
-            if 'chunk' in event:
-                chunk = event['chunk']
-                if 'bytes' in chunk:
-                    text = chunk['bytes'].decode('utf-8')
-                    print(f"   Response: {text}")
+            chunk = event.get('chunk')
+            if chunk and 'bytes' in chunk:
+                buf.extend(chunk['bytes'])
+        sys.stdout.write(f"   Response: {buf.decode('utf-8')}\n")
         
         return True
         
@@ -141,13 +160,35 @@ def test_agent_invocation():
         print(f"❌ Agent invocation error: {e}")
         return False
 
-def main():
-    """Main function to monitor AgentCore status."""
+def _check_status_snapshot():
+    """Print the agent status and return (status, versions, aliases)."""
+    print("🔍 Checking AgentCore agent status...")
+    
+    try:
+        agent, versions, aliases = status_snapshot()
+        _print_agent(agent)
+        return agent['agentStatus'], versions, aliases
+        
+    except Exception as e:
+        print(f"❌ Agent status check error: {e}")
+        return None, [], None
+
+def main(wait=False, poll_interval=30):
+    """Main function to monitor AgentCore status.
+    
+    With wait=True (--wait on the command line), keep polling while the agent
+    is still being created; every poll reuses the shared clients.
+    """
     print("🚀 QuantumViz Agent - AgentCore Status Monitor")
     print("=" * 60)
     
     # Check agent status
-    status = check_agent_status()
+    status, versions, aliases = _check_status_snapshot()
+    
+    while wait and status == 'CREATING':
+        print(f"⏳ Agent still creating, checking again in {poll_interval}s...")
+        time.sleep(poll_interval)
+        status, versions, aliases = _check_status_snapshot()
     
     if status:
         print(f"\n📊 Current Status: {status}")
@@ -156,11 +197,11 @@ def main():
             print("🎉 Agent is ready for use!")
             
             # Create alias if needed
-            alias_id = create_agent_alias_if_ready()
+            alias_id = create_agent_alias_if_ready(status)
             
             if alias_id:
                 # Test invocation
-                test_ok = test_agent_invocation()
+                test_ok = test_agent_invocation(alias_id, aliases)
                 
                 if test_ok:
                     print("\n✅ AgentCore integration complete!")
@@ -181,13 +222,15 @@ def main():
             print(f"📋 Agent status: {status}")
             print("   Monitor progress in AWS console")
     
-    # List versions for additional info
-    versions = list_agent_versions()
+    # Versions for additional info, only useful while the agent exists
+    if status in {'PREPARED', 'CREATING'}:
+        print("\n📋 Agent versions...")
+        _print_versions(versions)
     
     print(f"\n📋 Summary:")
     print(f"   Agent Status: {status}")
     print(f"   Versions: {len(versions)}")
 
 if __name__ == "__main__":
-    main()
+    main(wait='--wait' in sys.argv[1:])
 
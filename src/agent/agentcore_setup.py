@@ -4,21 +4,44 @@ QuantumViz Agent - AgentCore Runtime Setup
 Deploy and configure the core AI agent runtime.
 """
 
-import boto3
+import functools
 import json
 import time
 import sys
 import os
+import textwrap
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
+from aws_clients import client, supports_param
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Agent instruction prompt, built once at import
+_AGENT_INSTRUCTION = textwrap.dedent("""
+    You are QuantumViz, an AI agent specialized in quantum computing education. Your mission is to:
+
+    1. Parse and analyze quantum circuits written in QASM, Qiskit, or Cirq
+    2. Explain quantum concepts in simple, accessible language
+    3. Generate educational analogies for complex quantum phenomena
+    4. Adapt explanations based on user expertise level (beginner/intermediate/advanced)
+    5. Provide step-by-step guidance for quantum circuit understanding
+
+    Always be educational, encouraging, and accurate in your quantum explanations.
+    """).strip()
+
+@functools.lru_cache(maxsize=1)
+def _list_agents_cached():
+    """List all agents once (paginated) and share the result between steps."""
+    paginator = client('bedrock-agent', Config.AWS_REGION).get_paginator('list_agents')
+    result = paginator.paginate(PaginationConfig={'PageSize': 50}).build_full_result()
+    return tuple(result.get('agentSummaries', []))
+
 def create_agentcore_agent():
     """Create the AgentCore agent for QuantumViz."""
     logger.info("Creating AgentCore agent for QuantumViz...")
@@ -27,24 +50,14 @@ def create_agentcore_agent():
     try:
         # Initialize AgentCore client
         logger.debug(f"Initializing Bedrock Agent client in region: {Config.AWS_REGION}")
-        agentcore = boto3.client('bedrock-agent', region_name=Config.AWS_REGION)
+        agentcore = client('bedrock-agent', Config.AWS_REGION)
         
         # Agent configuration
         agent_config = {
             'agentName': 'QuantumViz-Agent',
             'description': 'AI agent that converts quantum code into interactive 3D visualizations with natural language explanations',
             'foundationModel': Config.FOUNDATION_MODEL,
-            'instruction': """
-            You are QuantumViz, an AI agent specialized in quantum computing education. Your mission is to:
-
-            1. Parse and analyze quantum circuits written in QASM, Qiskit, or Cirq
-            2. Explain quantum concepts in simple, accessible language
-            3. Generate educational analogies for complex quantum phenomena
-            4. Adapt explanations based on user expertise level (beginner/intermediate/advanced)
-            5. Provide step-by-step guidance for quantum circuit understanding
-
-            Always be educational, encouraging, and accurate in your quantum explanations.
-            """.strip(),
+            'instruction': _AGENT_INSTRUCTION,
             'idleSessionTTLInSeconds': 1800,  # 30 minutes
             'agentResourceRoleArn': Config.get_agent_role_arn()
         }
@@ -72,12 +85,27 @@ def create_agentcore_agent():
         print(f"❌ AgentCore agent creation error: {e}")
         return None
 
+def wait_for_agent(agent_id, timeout=300):
+    """Poll the agent with exponential backoff until it leaves CREATING/PREPARING."""
+    agentcore = client('bedrock-agent', Config.AWS_REGION)
+    deadline = time.monotonic() + timeout
+    backoff = 0.5
+    
+    while True:
+        status = agentcore.get_agent(agentId=agent_id)['agent']['agentStatus']
+        if status not in ('CREATING', 'PREPARING') or time.monotonic() >= deadline:
+            logger.info(f"Agent {agent_id} status: {status}")
+            return status
+        
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 10)
+
 def create_agent_execution_role():
     """Create IAM role for AgentCore execution."""
     print("\n🔐 Creating AgentCore execution role...")
     
     try:
-        iam = boto3.client('iam', region_name=Config.AWS_REGION)
+        iam = client('iam', Config.AWS_REGION)
         
         # Trust policy for AgentCore
         trust_policy = {
@@ -93,12 +121,20 @@ def create_agent_execution_role():
             ]
         }
         
-        # Create the role
-        role_response = iam.create_role(
-            RoleName=Config.AGENT_ROLE_NAME,
-            AssumeRolePolicyDocument=json.dumps(trust_policy),
-            Description='Role for QuantumViz AgentCore execution'
-        )
+        # Reuse the role if it exists, creating it only when missing
+        try:
+            iam.get_role(RoleName=Config.AGENT_ROLE_NAME)
+            attached = iam.list_attached_role_policies(RoleName=Config.AGENT_ROLE_NAME)
+            existing = {p['PolicyArn'] for p in attached['AttachedPolicies']}
+            role_existed = True
+        except iam.exceptions.NoSuchEntityException:
+            iam.create_role(
+                RoleName=Config.AGENT_ROLE_NAME,
+                AssumeRolePolicyDocument=json.dumps(trust_policy),
+                Description='Role for QuantumViz AgentCore execution'
+            )
+            existing = set()
+            role_existed = False
         
         # Attach more restrictive policies
         policies = [
@@ -112,37 +148,179 @@ def create_agent_execution_role():
                 'arn:aws:iam::aws:policy/AmazonDynamoDBReadOnlyAccess'
             ])
         
-        for policy_arn in policies:
-            iam.attach_role_policy(
-                RoleName=Config.AGENT_ROLE_NAME,
-                PolicyArn=policy_arn
-            )
+        missing = [policy_arn for policy_arn in policies if policy_arn not in existing]
         
-        print("✅ AgentCore execution role created")
-        print("   Role: AgentExecutionRole")
-        print("   Policies: Bedrock, S3, DynamoDB access")
+        # Attachments are independent IAM round-trips, so issue them together
+        if missing:
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                list(executor.map(
+                    lambda policy_arn: iam.attach_role_policy(
+                        RoleName=Config.AGENT_ROLE_NAME,
+                        PolicyArn=policy_arn
+                    ),
+                    missing
+                ))
+        
+        if role_existed:
+            print("✅ AgentCore execution role already exists")
+            if missing:
+                print(f"   Attached {len(missing)} missing policies")
+        else:
+            print("✅ AgentCore execution role created")
+            print("   Role: AgentExecutionRole")
+            print("   Policies: Bedrock, S3, DynamoDB access")
         
         return True
         
     except Exception as e:
-        if "EntityAlreadyExists" in str(e):
-            print("✅ AgentCore execution role already exists")
-            return True
+        print(f"❌ Role creation error: {e}")
+        return False
+
+# Index the knowledge base expects; titan-embed-text-v1 produces 1536-dim vectors
+_VECTOR_INDEX_BODY = {
+    'settings': {'index.knn': True},
+    'mappings': {
+        'properties': {
+            'vector': {
+                'type': 'knn_vector',
+                'dimension': 1536,
+                'method': {'name': 'hnsw', 'engine': 'faiss', 'space_type': 'l2'}
+            },
+            'text': {'type': 'text'},
+            'metadata': {'type': 'text', 'index': False}
+        }
+    }
+}
+
+def _create_policy(create, policy_type, name, policy):
+    """Create an OpenSearch Serverless security or access policy unless one with this name exists."""
+    try:
+        create(name=name, type=policy_type, policy=json.dumps(policy))
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConflictException':
+            raise
+
+def _find_collection(aoss, name):
+    """Return the collection's details, or None if it does not exist."""
+    details = aoss.batch_get_collection(names=[name]).get('collectionDetails', [])
+    return details[0] if details else None
+
+def wait_for_collection(name, timeout=600):
+    """Poll the collection with exponential backoff until it leaves CREATING."""
+    aoss = client('opensearchserverless', Config.AWS_REGION)
+    deadline = time.monotonic() + timeout
+    backoff = 2
+    
+    while True:
+        collection = _find_collection(aoss, name)
+        status = collection['status'] if collection else 'MISSING'
+        if status != 'CREATING' or time.monotonic() >= deadline:
+            logger.info(f"Collection {name} status: {status}")
+            return collection
+        
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 30)
+
+def create_kb_collection():
+    """Create the OpenSearch Serverless vector collection backing the knowledge base.
+    
+    An existing collection is reused. A new one is billed while it exists, so it
+    is only created when Config.KB_CREATE_COLLECTION is set. GPU-accelerated
+    vector indexing is requested when the installed botocore exposes the option.
+    Returns the collection ARN once the collection is ACTIVE, or None.
+    
+    Only Bedrock (and Config.KB_VPC_ENDPOINT_ID, if set) can reach the
+    collection, so the vector index is not created here: create
+    Config.VECTOR_INDEX_NAME with _VECTOR_INDEX_BODY from inside that VPC
+    before attaching the knowledge base.
+    """
+    print("\n🗄️  Creating vector search collection...")
+    name = Config.KB_COLLECTION_NAME
+    
+    try:
+        aoss = client('opensearchserverless', Config.AWS_REGION)
+        
+        collection = _find_collection(aoss, name)
+        if collection is None:
+            if not Config.KB_CREATE_COLLECTION:
+                print(f"⏭️  Collection {name} not found; set KB_CREATE_COLLECTION=true to create it")
+                return None
+            
+            # create_collection fails unless encryption and network policies cover the name.
+            # The collection stays off the public internet: only Bedrock and an
+            # optional VPC endpoint may connect
+            rules = [{'ResourceType': 'collection', 'Resource': [f'collection/{name}']}]
+            network = {'Rules': rules, 'AllowFromPublic': False, 'SourceServices': ['bedrock.amazonaws.com']}
+            if Config.KB_VPC_ENDPOINT_ID:
+                network['SourceVPCEs'] = [Config.KB_VPC_ENDPOINT_ID]
+            _create_policy(aoss.create_security_policy, 'encryption', f'{name}-enc',
+                           {'Rules': rules, 'AWSOwnedKey': True})
+            _create_policy(aoss.create_security_policy, 'network', f'{name}-net', [network])
+            
+            collection_config = {
+                'name': name,
+                'type': 'VECTORSEARCH',
+                'description': 'Vector store for the QuantumViz knowledge base'
+            }
+            
+            if supports_param(aoss, 'CreateCollection', 'vectorOptions'):
+                collection_config['vectorOptions'] = {
+                    'ServerlessVectorAcceleration': Config.KB_VECTOR_ACCELERATION
+                }
+            
+            aoss.create_collection(**collection_config)
+            print(f"✅ Collection created: {name}")
         else:
-            print(f"❌ Role creation error: {e}")
-            return False
+            print("✅ Collection already exists")
+        
+        # The knowledge base and ingestion roles read and write the collection's indexes
+        _create_policy(aoss.create_access_policy, 'data', f'{name}-data', [{
+            'Rules': [
+                {'ResourceType': 'collection', 'Resource': [f'collection/{name}'],
+                 'Permission': ['aoss:DescribeCollectionItems', 'aoss:CreateCollectionItems',
+                                'aoss:UpdateCollectionItems']},
+                {'ResourceType': 'index', 'Resource': [f'index/{name}/*'],
+                 'Permission': ['aoss:DescribeIndex', 'aoss:CreateIndex', 'aoss:UpdateIndex',
+                                'aoss:ReadDocument', 'aoss:WriteDocument']}
+            ],
+            'Principal': [Config.get_kb_role_arn(), Config.get_ingestion_role_arn()]
+        }])
+        
+        # The knowledge base can only attach to an ACTIVE collection
+        collection = wait_for_collection(name)
+        if collection is None or collection['status'] != 'ACTIVE':
+            status = collection['status'] if collection else 'MISSING'
+            print(f"❌ Collection {name} is not ACTIVE (status: {status})")
+            return None
+        
+        print(f"   Vector index {Config.VECTOR_INDEX_NAME} must exist before the knowledge base attaches;")
+        print(f"   create it from an allowed network with: {json.dumps(_VECTOR_INDEX_BODY)}")
+        return collection['arn']
+        
+    except ClientError as e:
+        print(f"❌ Collection creation error: {e.response['Error']['Message']}")
+        return None
+    except Exception as e:
+        print(f"❌ Collection creation error: {e}")
+        return None
 
 def create_agent_knowledge_base():
     """Create knowledge base for quantum computing information."""
     print("\n📚 Creating quantum computing knowledge base...")
     
+    collection_arn = create_kb_collection()
+    if collection_arn is None:
+        print("⏭️  Skipping knowledge base: no ACTIVE vector collection")
+        return None
+    
     try:
-        agentcore = boto3.client('bedrock-agent', region_name=Config.AWS_REGION)
+        agentcore = client('bedrock-agent', Config.AWS_REGION)
         
         # Knowledge base configuration
         kb_config = {
             'name': 'QuantumComputing-KnowledgeBase',
             'description': 'Knowledge base containing quantum computing concepts, algorithms, and educational materials',
+            'roleArn': Config.get_kb_role_arn(),
             'knowledgeBaseConfiguration': {
                 'type': 'VECTOR',
                 'vectorKnowledgeBaseConfiguration': {
@@ -152,7 +330,7 @@ def create_agent_knowledge_base():
             'storageConfiguration': {
                 'type': 'OPENSEARCH_SERVERLESS',
                 'opensearchServerlessConfiguration': {
-                    'collectionArn': Config.get_kb_collection_arn(),
+                    'collectionArn': collection_arn,
                     'vectorIndexName': Config.VECTOR_INDEX_NAME,
                     'fieldMapping': {
                         'vectorField': 'vector',
@@ -178,23 +356,132 @@ def create_agent_knowledge_base():
         print("   Note: This requires OpenSearch Serverless setup")
         return None
 
+def create_ingestion_pipeline():
+    """Create an OpenSearch Ingestion pipeline that embeds KB documents in batches.
+    
+    The pipeline has two stages. The first hands the documents under
+    Config.KB_SOURCE_PREFIX to Bedrock batch inference through the ml_inference
+    processor, which writes the embeddings to S3 rather than passing them on.
+    The second rescans that output prefix and indexes each text with its
+    embedding into the collection.
+    """
+    print("\n📦 Creating batch ingestion pipeline for the knowledge base...")
+    
+    if not (Config.ML_COMMONS_MODEL_ID and Config.OPENSEARCH_COLLECTION_ENDPOINT):
+        print("⚠️  Skipped: set ML_COMMONS_MODEL_ID and OPENSEARCH_COLLECTION_ENDPOINT")
+        return None
+    
+    try:
+        osis = client('osis', Config.AWS_REGION)
+        role_arn = Config.get_ingestion_role_arn()
+        aws = {'region': Config.AWS_REGION, 'sts_role_arn': role_arn}
+        output_prefix = 'embeddings/'
+        
+        pipeline = {
+            'version': '2',
+            # Stage 1: submit the source files as Bedrock batch inference jobs
+            f'{Config.INGESTION_PIPELINE_NAME}-batch': {
+                'source': {
+                    's3': {
+                        'codec': {'ndjson': {}},
+                        'compression': 'none',
+                        'aws': aws,
+                        # The batch job reads the objects itself; only their keys are needed
+                        'data_selection': 'metadata_only',
+                        'scan': {
+                            'buckets': [{
+                                'bucket': {
+                                    'name': Config.S3_BUCKET_NAME,
+                                    'filter': {'include_prefix': [Config.KB_SOURCE_PREFIX]}
+                                }
+                            }]
+                        }
+                    }
+                },
+                'processor': [{
+                    'ml_inference': {
+                        'host': Config.OPENSEARCH_COLLECTION_ENDPOINT,
+                        'action_type': 'batch_predict',
+                        'service_name': 'bedrock',
+                        'model_id': Config.ML_COMMONS_MODEL_ID,
+                        'output_path': f's3://{Config.S3_BUCKET_NAME}/{output_prefix}',
+                        'aws': aws
+                    }
+                }],
+                # Results land in S3 asynchronously; nothing flows on from here
+                'sink': [{'noop': {}}]
+            },
+            # Stage 2: index the batch job output (one JSON record per document)
+            f'{Config.INGESTION_PIPELINE_NAME}-index': {
+                'source': {
+                    's3': {
+                        'codec': {'ndjson': {}},
+                        'compression': 'none',
+                        'aws': aws,
+                        'scan': {
+                            'scheduling': {'interval': 'PT5M'},
+                            'buckets': [{
+                                'bucket': {
+                                    'name': Config.S3_BUCKET_NAME,
+                                    'filter': {
+                                        'include_prefix': [output_prefix],
+                                        'exclude_suffix': ['manifest.json.out']
+                                    }
+                                }
+                            }]
+                        }
+                    }
+                },
+                'processor': [
+                    {'copy_values': {'entries': [
+                        {'from_key': 'modelInput/inputText', 'to_key': 'text'},
+                        {'from_key': 'modelOutput/embedding', 'to_key': 'vector'}
+                    ]}},
+                    {'delete_entries': {'with_keys': ['modelInput', 'modelOutput']}}
+                ],
+                'sink': [{
+                    'opensearch': {
+                        'hosts': [Config.OPENSEARCH_COLLECTION_ENDPOINT],
+                        'index': Config.VECTOR_INDEX_NAME,
+                        'document_id': '${recordId}',
+                        'aws': dict(aws, serverless=True)
+                    }
+                }]
+            }
+        }
+        
+        # JSON is valid YAML, so no YAML dependency is needed for the body
+        response = osis.create_pipeline(
+            PipelineName=Config.INGESTION_PIPELINE_NAME,
+            MinUnits=1,
+            MaxUnits=4,
+            PipelineConfigurationBody=json.dumps(pipeline)
+        )
+        pipeline_name = response['Pipeline']['PipelineName']
+        
+        print(f"✅ Ingestion pipeline created: {pipeline_name}")
+        return pipeline_name
+        
+    except Exception as e:
+        print(f"❌ Ingestion pipeline creation error: {e}")
+        return None
+
 def test_agentcore_agent():
     """Test the created AgentCore agent."""
     print("\n🧪 Testing AgentCore agent...")
     
     try:
-        agentcore = boto3.client('bedrock-agent', region_name=Config.AWS_REGION)
-        
         # List agents
-        response = agentcore.list_agents()
-        agents = response['agentSummaries']
+        agents = _list_agents_cached()
         
-        print(f"✅ Found {len(agents)} AgentCore agents:")
+        lines = [f"✅ Found {len(agents)} AgentCore agents:"]
         
         for agent in agents:
-            print(f"   • {agent['agentName']} ({agent['agentId']})")
-            print(f"     Status: {agent['agentStatus']}")
-            print(f"     Created: {agent['createdAt']}")
+            lines.append(f"   • {agent['agentName']} ({agent['agentId']})")
+            lines.append(f"     Status: {agent['agentStatus']}")
+            lines.append(f"     Created: {agent['createdAt']}")
+        
+        sys.stdout.write("\n".join(lines) + "\n")
         
         return len(agents) > 0
         
@@ -207,11 +494,10 @@ def create_agent_alias():
     print("\n🏷️  Creating agent alias...")
     
     try:
-        agentcore = boto3.client('bedrock-agent', region_name=Config.AWS_REGION)
+        agentcore = client('bedrock-agent', Config.AWS_REGION)
         
         # List agents to get the latest agent ID
-        response = agentcore.list_agents()
-        agents = response['agentSummaries']
+        agents = _list_agents_cached()
         
         if not agents:
             print("❌ No agents found to create alias for")
@@ -252,6 +538,13 @@ def main():
         agent_id = create_agentcore_agent()
         
         if agent_id:
+            # create_agent returns while the agent is still being created
+            try:
+                agent_status = wait_for_agent(agent_id)
+                print(f"   Agent Status: {agent_status}")
+            except Exception as e:
+                print(f"⚠️  Could not confirm agent status: {e}")
+            
             # Test agent
             test_ok = test_agentcore_agent()
             
@@ -261,6 +554,7 @@ def main():
                 
                 # Create knowledge base (optional)
                 kb_id = create_agent_knowledge_base()
+                pipeline_name = create_ingestion_pipeline() if kb_id else None
                 
                 print("\n" + "=" * 60)
                 print("🎉 AgentCore Runtime Setup Complete!")
@@ -270,6 +564,8 @@ def main():
                     print(f"✅ Alias ID: {alias_id}")
                 if kb_id:
                     print(f"✅ Knowledge Base ID: {kb_id}")
+                if pipeline_name:
+                    print(f"✅ Ingestion Pipeline: {pipeline_name}")
                 
                 print("\n💡 Next Steps:")
                 print("   1. Deploy agent to runtime")
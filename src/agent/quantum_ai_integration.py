@@ -4,16 +4,104 @@ QuantumViz Agent - AI Integration
 Integrate AgentCore with quantum circuit analysis and explanations.
 """
 
-import boto3
+import asyncio
+import codecs
+import itertools
 import json
 import sys
 import os
-from braket.circuits import Circuit
-from braket.devices import LocalSimulator
-import time
+import threading
+import uuid
+from functools import cached_property, lru_cache
+from types import MappingProxyType
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
+from aws_clients import aio_client, client, supports_param
+
+# Suffix for session IDs; unique within the process without reading the clock
+_session_counter = itertools.count()
+
+def _new_circuit():
+    from braket.circuits import Circuit
+    return Circuit()
+
+def _new_simulator():
+    from braket.devices import LocalSimulator
+    return LocalSimulator()
+
+def _completion_bytes(completion):
+    """Yield the raw bytes of each chunk in an invoke_agent completion stream."""
+    for event in completion:
+        chunk = event.get('chunk')
+        if chunk and 'bytes' in chunk:
+            yield chunk['bytes']
+
+def _bell_circuit():
+    return _new_circuit().h(0).cnot(0, 1)
+
+def _superposition_circuit():
+    return _new_circuit().h(0)
+
+def _teleportation_circuit():
+    # Simple teleportation circuit
+    return _new_circuit().h(0).cnot(0, 1).h(2).cnot(2, 0).h(2)
+
+# Checked in order; the first builder sharing a word with the description wins
+# Matched as substrings so inflections ("entangled", "superpositions") count;
+# stems cover at least every phrase the original checks did
+_BUILDERS = (
+    (('bell state', 'entangl'), _bell_circuit),
+    (('superposition',), _superposition_circuit),
+    (('teleport',), _teleportation_circuit),
+)
+
+def _sample_counts(circuit, simulator, shots=1024):
+    """Draw measurement counts from the circuit's exact outcome distribution.
+    
+    A shots=0 run returns the probability vector directly, which is much
+    cheaper than simulating every shot for these few-qubit circuits.
+    """
+    import numpy as np
+    
+    result = simulator.run(circuit.copy().probability(), shots=0)
+    probabilities = np.asarray(result.result().values[0], dtype=float)
+    samples = np.random.default_rng().multinomial(shots, probabilities / probabilities.sum())
+    
+    width = circuit.qubit_count
+    return {
+        format(index, f'0{width}b'): int(count)
+        for index, count in enumerate(samples)
+        if count
+    }
+
+@lru_cache(maxsize=32)
+def _cached_counts(description):
+    """Simulate the circuit for a normalized description once.
+    
+    The counts are frozen so the cached mapping can be shared safely.
+    """
+    circuit = QuantumAIIntegration.create_circuit_from_description(description)
+    return MappingProxyType(_sample_counts(circuit, _new_simulator()))
+
+def _simulate(description):
+    """Return a caller-owned copy of the cached counts for a normalized description."""
+    return dict(_cached_counts(description))
+
+# Shared instructions for every circuit analysis; kept identical across calls
+# so the agent's prompt prefix can be served from Bedrock's prompt cache
+_ANALYSIS_RUBRIC = """
+        Analyze this quantum circuit and provide an educational explanation.
+        
+        Please provide:
+        1. What this circuit does (simple explanation)
+        2. Key quantum concepts demonstrated
+        3. Why we get these specific results
+        4. Educational analogies for beginners
+        5. Real-world applications
+        
+        Make it engaging and accessible for someone learning quantum computing.
+        """
 
 class QuantumAIIntegration:
     """AI-powered quantum circuit analysis and explanation."""
@@ -21,15 +109,36 @@ class QuantumAIIntegration:
     def __init__(self):
         self.agent_id = os.getenv('AGENT_ID', 'DRC1I6SIWE')  # Use env var or default
         self.region = Config.AWS_REGION
-        self.runtime = boto3.client('bedrock-agent-runtime', region_name=self.region)
-        self.simulator = LocalSimulator()
+        self._alias_id = None
+        self._alias_lock = threading.Lock()
+        # One session per instance lets the agent reuse context across prompts
+        self._session_prefix = f'quantumviz-{uuid.uuid4().hex}'
+        self.new_session()
+    
+    @cached_property
+    def runtime(self):
+        """bedrock-agent-runtime client, created on first use."""
+        return client('bedrock-agent-runtime', self.region)
+    
+    @cached_property
+    def simulator(self):
+        """Local Braket simulator, created on first use."""
+        return _new_simulator()
+    
+    def new_session(self):
+        """Start a fresh agent session with no prior conversation context."""
+        self.session_id = self._next_session_id()
+        return self.session_id
+    
+    def _next_session_id(self):
+        return f'{self._session_prefix}-{next(_session_counter)}'
         
     def create_agent_alias(self):
         """Create agent alias for easier access."""
         print("🏷️  Creating agent alias...")
         
         try:
-            agentcore = boto3.client('bedrock-agent', region_name=Config.AWS_REGION)
+            agentcore = client('bedrock-agent', Config.AWS_REGION)
             
             response = agentcore.create_agent_alias(
                 agentId=self.agent_id,
@@ -52,7 +161,7 @@ class QuantumAIIntegration:
     def get_agent_alias(self):
         """Get existing agent alias."""
         try:
-            agentcore = boto3.client('bedrock-agent', region_name=Config.AWS_REGION)
+            agentcore = client('bedrock-agent', Config.AWS_REGION)
             
             response = agentcore.list_agent_aliases(agentId=self.agent_id)
             aliases = response['agentAliasSummaries']
@@ -68,37 +177,60 @@ class QuantumAIIntegration:
             print(f"❌ Alias retrieval error: {e}")
             return None
     
-    def analyze_quantum_circuit(self, circuit_description):
-        """Analyze quantum circuit with AI explanations."""
+    def _get_or_create_alias(self):
+        """Resolve the agent alias once per instance and reuse it afterwards.
+        
+        The lock keeps concurrent demos from each issuing create_agent_alias.
+        """
+        with self._alias_lock:
+            if not self._alias_id:
+                self._alias_id = self.get_agent_alias() or self.create_agent_alias()
+            return self._alias_id
+    
+    def analyze_quantum_circuit(self, circuit_description, simulator=None, fresh=False, session_id=None):
+        """Analyze quantum circuit with AI explanations.
+        
+        Simulation results are cached per description; pass fresh=True to
+        draw a new sample instead. session_id defaults to the instance session.
+        """
+        circuit, counts, analysis_prompt = self._prepare_analysis(circuit_description, simulator, fresh)
+        
+        # Get AI explanation
+        explanation = self.get_ai_explanation(analysis_prompt, session_id)
+        
+        return self._analysis_result(circuit, counts, explanation)
+    
+    async def analyze_quantum_circuit_async(self, circuit_description, runtime=None, session_id=None):
+        """Analyze a circuit without blocking the event loop.
+        
+        runtime is an optional aioboto3 bedrock-agent-runtime client.
+        """
+        circuit, counts, analysis_prompt = await asyncio.to_thread(self._prepare_analysis, circuit_description)
+        explanation = await self.get_ai_explanation_async(analysis_prompt, runtime, session_id)
+        return self._analysis_result(circuit, counts, explanation)
+    
+    def _prepare_analysis(self, circuit_description, simulator=None, fresh=False):
+        """Build the circuit, simulate it and render the analysis prompt."""
         print(f"🤖 Analyzing quantum circuit: {circuit_description}")
         
         # Create the circuit
         circuit = self.create_circuit_from_description(circuit_description)
         
         # Run quantum simulation
-        result = self.simulator.run(circuit, shots=1024)
-        counts = result.result().measurement_counts
-        
-        # Prepare analysis prompt
-        analysis_prompt = f"""
-        Analyze this quantum circuit and provide an educational explanation:
+        if fresh:
+            counts = _sample_counts(circuit, simulator or self.simulator)
+        else:
+            counts = _simulate(circuit_description.lower().strip())
         
+        # Static rubric first so every demo prompt shares the same prefix
+        analysis_prompt = f"""{_ANALYSIS_RUBRIC}
         Circuit: {circuit_description}
         Results: {dict(counts)}
-        
-        Please provide:
-        1. What this circuit does (simple explanation)
-        2. Key quantum concepts demonstrated
-        3. Why we get these specific results
-        4. Educational analogies for beginners
-        5. Real-world applications
-        
-        Make it engaging and accessible for someone learning quantum computing.
         """
         
-        # Get AI explanation
-        explanation = self.get_ai_explanation(analysis_prompt)
-        
+        return circuit, counts, analysis_prompt
+    
+    def _analysis_result(self, circuit, counts, explanation):
         return {
             'circuit': circuit,
             'results': counts,
@@ -106,109 +238,146 @@ class QuantumAIIntegration:
             'visualization_data': self.prepare_visualization_data(counts)
         }
     
-    def create_circuit_from_description(self, description):
+    @staticmethod
+    def create_circuit_from_description(description):
         """Create quantum circuit from description."""
-        circuit = Circuit()
+        text = description.lower()
+        for keywords, build in _BUILDERS:
+            if any(keyword in text for keyword in keywords):
+                return build()
         
-        if 'bell state' in description.lower() or 'entanglement' in description.lower():
-            circuit.h(0)
-            circuit.cnot(0, 1)
+        # Default: Bell state
+        return _bell_circuit()
+    
+    def stream_ai_explanation(self, prompt):
+        """Yield the AgentCore explanation text chunk by chunk as it arrives."""
+        # A multibyte character can be split across chunks, so decode incrementally
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for data in self._stream_bytes(prompt):
+            text = decoder.decode(data)
+            if text:
+                yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+    
+    def get_ai_explanation(self, prompt, session_id=None):
+        """Get AI explanation from AgentCore."""
+        # Join the raw chunks and decode once rather than per chunk
+        return b''.join(self._stream_bytes(prompt, session_id)).decode('utf-8').strip()
+    
+    def _stream_bytes(self, prompt, session_id=None):
+        """Yield the raw UTF-8 chunks of the agent's explanation."""
+        print("🧠 Getting AI explanation...")
+        
+        try:
+            alias_id = self._get_or_create_alias()
             
-        elif 'superposition' in description.lower():
-            circuit.h(0)
+            if not alias_id:
+                yield "❌ Unable to access AgentCore agent".encode('utf-8')
+                return
             
-        elif 'teleportation' in description.lower():
-            # Simple teleportation circuit
-            circuit.h(0)
-            circuit.cnot(0, 1)
-            circuit.h(2)
-            circuit.cnot(2, 0)
-            circuit.h(2)
+            # Invoke agent
+            response = self.runtime.invoke_agent(**self._invoke_request(alias_id, prompt, session_id))
             
-        else:
-            # Default: Bell state
-            circuit.h(0)
-            circuit.cnot(0, 1)
-        
-        return circuit
+            yield from _completion_bytes(response['completion'])
+            
+        except Exception as e:
+            print(f"❌ AI explanation error: {e}")
+            yield f"AI explanation temporarily unavailable: {e}".encode('utf-8')
     
-    def get_ai_explanation(self, prompt):
-        """Get AI explanation from AgentCore."""
+    async def get_ai_explanation_async(self, prompt, runtime=None, session_id=None):
+        """Get AI explanation without blocking the event loop.
+        
+        With an aioboto3 runtime client the completion stream is read natively,
+        so other requests proceed while this one is still streaming; otherwise
+        the blocking call runs on a worker thread.
+        """
+        if runtime is None:
+            return await asyncio.to_thread(self.get_ai_explanation, prompt, session_id)
+        
         print("🧠 Getting AI explanation...")
         
         try:
-            # Get agent alias
-            alias_id = self.get_agent_alias()
-            if not alias_id:
-                alias_id = self.create_agent_alias()
+            alias_id = await asyncio.to_thread(self._get_or_create_alias)
             
             if not alias_id:
                 return "❌ Unable to access AgentCore agent"
             
-            # Invoke agent
-            response = self.runtime.invoke_agent(
-                agentId=self.agent_id,
-                agentAliasId=alias_id,
-                sessionId=f'session-{int(time.time())}',
-                inputText=prompt
-            )
+            response = await runtime.invoke_agent(**self._invoke_request(alias_id, prompt, session_id))
             
-            # Read response
-            explanation = ""
-            for event in response['completion']:
-                if 'chunk' in event:
-                    chunk = event['chunk']
-                    if 'bytes' in chunk:
-                        text = chunk['bytes'].decode('utf-8')
-                        explanation += text
+            parts = []
+            async for event in response['completion']:
+                chunk = event.get('chunk')
+                if chunk and 'bytes' in chunk:
+                    parts.append(chunk['bytes'])
             
-            return explanation.strip()
+            return b''.join(parts).decode('utf-8').strip()
             
         except Exception as e:
             print(f"❌ AI explanation error: {e}")
             return f"AI explanation temporarily unavailable: {e}"
     
+    def _invoke_request(self, alias_id, prompt, session_id=None):
+        """Build the invoke_agent arguments shared by the sync and async paths."""
+        request = dict(
+            agentId=self.agent_id,
+            agentAliasId=alias_id,
+            sessionId=session_id or self.session_id,
+            inputText=prompt
+        )
+        # Without this the agent sends the final answer as a single chunk
+        if supports_param(self.runtime, 'InvokeAgent', 'streamingConfigurations'):
+            request['streamingConfigurations'] = {'streamFinalResponse': True}
+        return request
+    
     def prepare_visualization_data(self, counts):
         """Prepare data for 3D visualization."""
-        total_shots = sum(counts.values())
+        items = list(counts.items())
+        total_shots = sum(count for _, count in items)
+        # Detect once and share the result instead of re-scanning counts
+        entangled = self.detect_entanglement(counts, total_shots)
         
         visualization_data = {
-            'states': list(counts.keys()),
-            'probabilities': [counts[state] / total_shots for state in counts.keys()],
+            'states': [state for state, _ in items],
+            'probabilities': [count / total_shots for _, count in items],
             'total_shots': total_shots,
-            'entanglement_detected': self.detect_entanglement(counts),
-            'quantum_concepts': self.identify_quantum_concepts(counts)
+            'entanglement_detected': entangled,
+            'quantum_concepts': self.identify_quantum_concepts(counts, entangled)
         }
         
         return visualization_data
     
-    def detect_entanglement(self, counts):
+    def detect_entanglement(self, counts, total_shots=None):
         """Detect quantum entanglement from results."""
-        states = list(counts.keys())
+        # Both Bell outcomes are required; bail out before any summing
+        if '00' not in counts or '11' not in counts:
+            return False
         
         # Perfect Bell state: only |00⟩ and |11⟩
-        if len(states) == 2 and '00' in states and '11' in states:
+        if len(counts) == 2:
             return True
         
         # Check for correlation
-        total_shots = sum(counts.values())
-        if '00' in counts and '11' in counts:
-            correlation = (counts['00'] + counts['11']) / total_shots
-            return correlation > 0.8
-        
-        return False
+        if total_shots is None:
+            total_shots = sum(counts.values())
+        correlation = (counts['00'] + counts['11']) / total_shots
+        return correlation > 0.8
     
-    def identify_quantum_concepts(self, counts):
+    def identify_quantum_concepts(self, counts, entangled=None):
         """Identify quantum concepts from results."""
         concepts = []
         
-        if self.detect_entanglement(counts):
+        if entangled is None:
+            entangled = self.detect_entanglement(counts)
+        
+        if entangled:
             concepts.append('Quantum Entanglement')
         
         if len(counts) > 1:
             concepts.append('Quantum Superposition')
         
-        if any('1' in state for state in counts.keys()):
+        if '1' in ''.join(counts):
             concepts.append('Quantum Measurement')
         
         return concepts
@@ -225,19 +394,19 @@ class QuantumAIIntegration:
             "Demonstrate quantum teleportation protocol"
         ]
         
-        results = []
+        # Each demo is an independent simulation plus agent round-trip, so run
+        # them side by side and print the grouped output once all are done
+        results = asyncio.run(self._run_demos(demo_circuits))
         
-        for i, circuit_desc in enumerate(demo_circuits, 1):
+        for i, (circuit_desc, analysis) in enumerate(zip(demo_circuits, results), 1):
             print(f"\n{i}. {circuit_desc}")
             print("-" * 50)
             
-            # Analyze circuit
-            analysis = self.analyze_quantum_circuit(circuit_desc)
-            
             # Display results
             print("📊 Quantum Results:")
+            total_shots = analysis['visualization_data']['total_shots']
             for state, count in analysis['results'].items():
-                probability = count / sum(analysis['results'].values())
+                probability = count / total_shots
                 print(f"   |{state}⟩: {count} times ({probability:.1%})")
             
             print(f"\n🤖 AI Explanation:")
@@ -246,11 +415,33 @@ class QuantumAIIntegration:
             print(f"\n🔬 Quantum Concepts:")
             for concept in analysis['visualization_data']['quantum_concepts']:
                 print(f"   • {concept}")
-            
-            results.append(analysis)
         
         return results
     
+    async def _run_demos(self, demo_circuits):
+        """Run all demos concurrently, sharing one aioboto3 client when installed."""
+        # Concurrent turns in one agent session would interleave their
+        # context, so every demo gets a session of its own
+        session_ids = [self._next_session_id() for _ in demo_circuits]
+        try:
+            import aioboto3
+        except ImportError:
+            # Fall back to the blocking path on worker threads
+            return list(await asyncio.gather(
+                *(asyncio.to_thread(self._run_demo, desc, sid) for desc, sid in zip(demo_circuits, session_ids))
+            ))
+        
+        session = aioboto3.Session()
+        async with aio_client(session, 'bedrock-agent-runtime', self.region) as runtime:
+            return list(await asyncio.gather(
+                *(self.analyze_quantum_circuit_async(desc, runtime, sid)
+                  for desc, sid in zip(demo_circuits, session_ids))
+            ))
+    
+    def _run_demo(self, circuit_desc, session_id=None):
+        """Analyze one demo circuit; the cached simulation builds its own simulator per run."""
+        return self.analyze_quantum_circuit(circuit_desc, session_id=session_id)
+    
     def test_agent_connectivity(self):
         """Test AgentCore agent connectivity."""
         print("🔍 Testing AgentCore connectivity...")
@@ -259,9 +450,7 @@ class QuantumAIIntegration:
             # Simple test prompt
             test_prompt = "Hello! Can you explain what quantum computing is in simple terms?"
             
-            alias_id = self.get_agent_alias()
-            if not alias_id:
-                alias_id = self.create_agent_alias()
+            alias_id = self._get_or_create_alias()
             
             if alias_id:
                 response = self.runtime.invoke_agent(
@@ -272,13 +461,7 @@ class QuantumAIIntegration:
                 )
                 
                 # Read response
-                explanation = ""
-                for event in response['completion']:
-                    if 'chunk' in event:
-                        chunk = event['chunk']
-                        if 'bytes' in chunk:
-                            text = chunk['bytes'].decode('utf-8')
-                            explanation += text
+                explanation = b''.join(_completion_bytes(response['completion'])).decode('utf-8')
                 
                 print("✅ AgentCore connectivity successful!")
                 print(f"🤖 Agent response: {explanation[:200]}...")
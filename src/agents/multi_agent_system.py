@@ -5,13 +5,237 @@ Advanced agent-to-agent communication for quantum circuit optimization and educa
 """
 
 import boto3
+import hashlib
 import json
+import logging
+import os
+import string
+import sys
+import numpy as np
 import asyncio
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from functools import lru_cache, partial
+from typing import Dict, List, Any, Optional, Union
+from dataclasses import asdict, dataclass
 from enum import Enum
 import uuid
 from datetime import datetime
+# Add parent directory to path to import the shared AWS clients
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aws_clients import aio_client, client
+
+try:
+    import orjson
+    _dumps, _loads = orjson.dumps, orjson.loads
+except ImportError:
+    _loads = json.loads
+    
+    def _dumps(obj):
+        return json.dumps(obj, default=asdict).encode("utf-8")
+
+logger = logging.getLogger("quantumviz.multi_agent")
+
+try:
+    import msgspec
+    
+    class _ClaudeCompletion(msgspec.Struct):
+        completion: str
+    
+    # Decodes straight into the one field we use and skips the rest of the body
+    _completion_decoder = msgspec.json.Decoder(_ClaudeCompletion)
+    
+    def _completion_text(raw: bytes) -> str:
+        return _completion_decoder.decode(raw).completion
+except ImportError:
+    def _completion_text(raw: bytes) -> str:
+        return _loads(raw)['completion']
+
+# Claude request body; only the JSON-encoded prompt changes between calls
+_CLAUDE_BODY = b'{"prompt":%b,"max_tokens":1000,"temperature":0.7}'
+
+# Bounded pool shared by every blocking Bedrock call made from async code
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="bedrock")
+
+# Prompt skeletons built once at import; handlers only fill in the fields
+_EXPLAIN_TMPL = """
+        As a quantum physics teacher, explain '{concept}' to a {level} student.
+        Include:
+        1. Simple analogy
+        2. Mathematical representation
+        3. Real-world applications
+        4. Common misconceptions
+        5. Next learning steps
+        
+        Make it engaging and memorable.
+        """
+
+_ASSESS_TMPL = """
+        Assess this student's understanding of {concept}:
+        Student response: "{student_response}"
+        
+        Provide:
+        1. Understanding level (1-10)
+        2. Strengths identified
+        3. Misconceptions to address
+        4. Recommended next steps
+        5. Encouraging feedback
+        """
+
+_EDU_CONTENT_TMPL = """
+        Create educational content for this quantum circuit:
+        Circuit: {circuit}
+        Analysis: {analysis}
+        
+        Include:
+        1. Step-by-step explanation
+        2. Key concepts highlighted
+        3. Common mistakes to avoid
+        4. Practice exercises
+        5. Advanced extensions
+        """
+
+# Split at the analysis hole so the task-dependent half can be rendered early
+_EDU_CONTENT_HEAD, _EDU_CONTENT_TAIL = _EDU_CONTENT_TMPL.split("{analysis}")
+
+_ANALYZE_CIRCUIT_TMPL = """
+        Analyze this quantum circuit for potential issues:
+        Circuit: {circuit}
+        
+        Check for:
+        1. Gate compatibility
+        2. Qubit connectivity
+        3. Circuit depth optimization
+        4. Measurement issues
+        5. Entanglement patterns
+        6. Decoherence considerations
+        
+        Provide specific recommendations.
+        """
+
+_SYNTHESIS_TMPL = """
+        Synthesize these multi-agent collaboration results:
+        Task: {task}
+        Results: {results}
+        
+        Create a comprehensive response that combines all agent insights.
+        """
+
+def _json_fragment(text: str) -> bytes:
+    """JSON-escape text without the surrounding quotes."""
+    return _dumps(text)[1:-1]
+
+class _PromptTemplate:
+    """A prompt template whose fixed text is JSON-escaped once, at import.
+    
+    Rendering only escapes the field values and joins byte segments, giving
+    the quoted JSON string _CLAUDE_BODY expects for its prompt.
+    """
+    
+    __slots__ = ("_segments",)
+    
+    def __init__(self, template: str):
+        self._segments = tuple(
+            (_json_fragment(literal), field)
+            for literal, field, _, _ in string.Formatter().parse(template)
+        )
+    
+    def fragment(self, values: Dict[str, Any]) -> bytes:
+        """Render to escaped bytes without quotes, for splicing into a larger prompt."""
+        parts = []
+        for literal, field in self._segments:
+            parts.append(literal)
+            if field is not None:
+                parts.append(_json_fragment(str(values[field])))
+        return b"".join(parts)
+    
+    def render(self, values: Dict[str, Any]) -> bytes:
+        return b'"%b"' % self.fragment(values)
+
+_EXPLAIN = _PromptTemplate(_EXPLAIN_TMPL)
+_ASSESS = _PromptTemplate(_ASSESS_TMPL)
+_EDU_CONTENT_PREFIX = _PromptTemplate(_EDU_CONTENT_HEAD)
+_EDU_CONTENT_SUFFIX = _json_fragment(_EDU_CONTENT_TAIL)
+_ANALYZE_CIRCUIT = _PromptTemplate(_ANALYZE_CIRCUIT_TMPL)
+
+@lru_cache(maxsize=1)
+def _aio_session():
+    """Process-wide aioboto3 session, or None when aioboto3 is not installed."""
+    try:
+        import aioboto3
+    except ImportError:
+        return None
+    return aioboto3.Session()
+
+# Long-lived aioboto3 clients keyed by (event loop, service, region). Each is
+# entered once on its loop's exit stack and closed by close_aio_clients()
+_aio_clients: Dict[tuple, asyncio.Task] = {}
+_aio_stacks: Dict[asyncio.AbstractEventLoop, AsyncExitStack] = {}
+
+async def _loop_aio_client(service: str, region: str):
+    """Return the running loop's shared aioboto3 client for a service, opening it on first use."""
+    loop = asyncio.get_running_loop()
+    key = (loop, service, region)
+    opening = _aio_clients.get(key)
+    if opening is None:
+        # Store the opening task so concurrent first callers share one client
+        stack = _aio_stacks.setdefault(loop, AsyncExitStack())
+        opening = _aio_clients[key] = loop.create_task(
+            stack.enter_async_context(aio_client(_aio_session(), service, region))
+        )
+    return await opening
+
+async def close_aio_clients():
+    """Close the aioboto3 clients opened on the running loop; call before the loop shuts down."""
+    loop = asyncio.get_running_loop()
+    for key in [k for k in _aio_clients if k[0] is loop]:
+        del _aio_clients[key]
+    stack = _aio_stacks.pop(loop, None)
+    if stack is not None:
+        await stack.aclose()
+
+def _depth_and_entanglers(qubits, targets, n_qubits):
+    """Return (circuit depth, two-qubit gate count); targets are -1 for one-qubit gates."""
+    layers = np.zeros(n_qubits, dtype=np.int64)
+    entanglers = 0
+    for i in range(qubits.shape[0]):
+        q = qubits[i]
+        t = targets[i]
+        if t >= 0:
+            layer = max(layers[q], layers[t]) + 1
+            layers[q] = layer
+            layers[t] = layer
+            entanglers += 1
+        else:
+            layers[q] += 1
+    return layers.max(), entanglers
+
+try:
+    from numba import njit
+    _depth_and_entanglers_jit = njit(cache=True)(_depth_and_entanglers)
+except ImportError:
+    _depth_and_entanglers_jit = _depth_and_entanglers
+
+# Gate count from which compiling the kernel pays for itself
+_JIT_MIN_GATES = 256
+
+_ERROR_MARKERS = ("error", "issue", "problem", "incompatible", "invalid", "warning")
+_OPTIMIZATION_MARKERS = ("optimiz", "reduce", "simplif", "remove", "merge", "cancel")
+
+def _target_index(gate: Dict[str, Any]) -> int:
+    """Return a gate's target qubit, or -1 when it has none."""
+    target = gate.get("target")
+    return -1 if target is None else target
+
+def _matching_lines(text: str, markers: tuple) -> List[str]:
+    """Return the non-empty lines of text that mention any of the markers."""
+    matches = []
+    for line in text.splitlines():
+        lowered = line.lower()
+        if any(marker in lowered for marker in markers):
+            matches.append(line.strip(" -*\t"))
+    return [line for line in matches if line]
 
 class AgentRole(Enum):
     TEACHER = "teacher"
@@ -20,7 +244,7 @@ class AgentRole(Enum):
     SIMULATOR = "simulator"
     VISUALIZER = "visualizer"
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AgentMessage:
     sender: str
     recipient: str
@@ -29,21 +253,51 @@ class AgentMessage:
     timestamp: str
     priority: int = 1
 
+try:
+    import msgspec
+    
+    class AgentResult(msgspec.Struct):
+        """One agent's contribution to a collaboration."""
+        agent_id: str
+        role: str
+        result: Any = None
+        error: Optional[str] = None
+    
+    _encode_json = msgspec.json.encode
+except ImportError:
+    @dataclass(slots=True)
+    class AgentResult:
+        """One agent's contribution to a collaboration."""
+        agent_id: str
+        role: str
+        result: Any = None
+        error: Optional[str] = None
+    
+    _encode_json = _dumps
+
 class QuantumAgent:
     """Base class for all quantum agents following AWS Bedrock Agent patterns."""
     
-    def __init__(self, agent_id: str, role: AgentRole, region: str = "eu-central-1"):
+    # message_type -> handler method name, filled in by each agent type
+    _HANDLERS: Dict[str, str] = {}
+    
+    def __init__(self, agent_id: str, role: AgentRole, region: str = "eu-central-1",
+                 boto3_session: Optional[boto3.Session] = None):
         self.agent_id = agent_id
         self.role = role
         self.region = region
-        self.bedrock_client = boto3.client('bedrock-runtime', region_name=region)
-        self.bedrock_agent_client = boto3.client('bedrock-agent', region_name=region)
-        self.bedrock_agent_runtime = boto3.client('bedrock-agent-runtime', region_name=region)
+        self._boto3_session = boto3_session
+        self.bedrock_client = client('bedrock-runtime', region, boto3_session)
+        self.bedrock_agent_client = client('bedrock-agent', region, boto3_session)
+        self.bedrock_agent_runtime = client('bedrock-agent-runtime', region, boto3_session)
         self.memory = {}
         self.capabilities = []
         self.action_groups = []
         self.knowledge_bases = []
-        self.session_id = str(uuid.uuid4())
+        # Raw 16 bytes; rendered as hex only where a string is required
+        self.session_id = uuid.uuid4().bytes
+        # Resolve the message_type -> method table to bound methods once
+        self._handlers = {message_type: getattr(self, name) for message_type, name in self._HANDLERS.items()}
         
     def add_action_group(self, action_group_name: str, description: str, functions: List[Dict[str, Any]]):
         """Add action group following AWS Bedrock Agent patterns."""
@@ -66,81 +320,123 @@ class QuantumAgent:
         
     async def invoke_agent(self, input_text: str, session_attributes: Dict[str, str] = None) -> Dict[str, Any]:
         """Invoke AWS Bedrock Agent following proper patterns."""
+        if self._boto3_session is not None or _aio_session() is None:
+            # The boto3 call and stream read block, so keep them off the event loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                _executor, partial(self._invoke_agent_sync, input_text, session_attributes)
+            )
+        
         try:
-            response = self.bedrock_agent_runtime.invoke_agent(
-                agentId=self.agent_er_agents: List['QuantumAgent'], task: Dict[str, Any]) -> Dict[str, Any]:
+            runtime = await _loop_aio_client('bedrock-agent-runtime', self.region)
+            response = await runtime.invoke_agent(**self._agent_request(input_text, session_attributes))
+            
+            completion = ""
+            async for event in response["completion"]:
+                if "chunk" in event and "bytes" in event["chunk"]:
+                    completion += event["chunk"]["bytes"].decode("utf-8")
+            
+            return {"completion": completion, "session_id": self.session_id.hex()}
+        except Exception as e:
+            return {"error": str(e), "session_id": self.session_id.hex()}
+    
+    def _invoke_agent_sync(self, input_text: str, session_attributes: Dict[str, str] = None) -> Dict[str, Any]:
+        try:
+            response = self.bedrock_agent_runtime.invoke_agent(**self._agent_request(input_text, session_attributes))
+            
+            completion = ""
+            for event in response["completion"]:
+                if "chunk" in event and "bytes" in event["chunk"]:
+                    completion += event["chunk"]["bytes"].decode("utf-8")
+            
+            return {"completion": completion, "session_id": self.session_id.hex()}
+        except Exception as e:
+            return {"error": str(e), "session_id": self.session_id.hex()}
+    
+    def _agent_request(self, input_text: str, session_attributes: Dict[str, str] = None) -> Dict[str, Any]:
+        return dict(
+            agentId=self.agent_id,
+            agentAliasId="TSTALIASID",
+            sessionId=self.session_id.hex(),
+            inputText=input_text,
+            sessionState={"sessionAttributes": session_attributes or {}}
+        )
+    
+    async def send_message(self, recipient: 'QuantumAgent', message: AgentMessage) -> AgentMessage:
+        """Deliver a message straight to the recipient agent and return its reply."""
+        return await recipient.process_message(message)
+    
+    async def process_message(self, message: AgentMessage) -> Optional[AgentMessage]:
+        """Handle a message sent by another agent by dispatching on its type."""
+        handler = self._handlers.get(message.message_type)
+        if handler is None:
+            return None
+        return await handler(message)
+    
+    async def collaborate(self, other_agents: List['QuantumAgent'], task: Dict[str, Any]) -> Dict[str, Any]:
         """Collaborate with other agents on a task."""
         raise NotImplementedError
+    
+    async def _call_claude(self, prompt: Union[str, bytes]) -> str:
+        return await _call_claude(prompt)
+    
+    def _get_timestamp(self) -> str:
+        return _get_timestamp()
 
 class TeacherAgent(QuantumAgent):
     """Educational agent specializing in quantum concepts explanation."""
     
+    _HANDLERS = {
+        "explain_concept": "_handle_explain_concept",
+        "assess_understanding": "_handle_assess_understanding",
+    }
+    
     def __init__(self, agent_id: str = "teacher_001"):
         super().__init__(agent_id, AgentRole.TEACHER)
         self.capabilities = ["explanation", "pedagogy", "assessment"]
         
-    async def process_message(self, message: AgentMessage) -> AgentMessage:
-        """Generate educational explanations."""
-        if message.message_type == "explain_concept":
-            concept = message.content.get("concept", "quantum superposition")
-            level = message.content.get("level", "beginner")
-            
-            prompt = f"""
-            As a quantum physics teacher, explain '{concept}' to a {level} student.
-            Include:
-            1. Simple analogy
-            2. Mathematical representation
-            3. Real-world applications
-            4. Common misconceptions
-            5. Next learning steps
-            
-            Make it engaging and memorable.
-            """
-            
-            response = await self._call_claude(prompt)
-            
-            return AgentMessage(
-                sender=self.agent_id,
-                recipient=message.sender,
-                message_type="explanation_response",
-                content={
-                    "explanation": response,
-                    "concept": concept,
-                    "level": level,
-                    "pedagogical_approach": "constructivist"
-                },
-                timestamp=self._get_timestamp()
-            )
-            
-        elif message.message_type == "assess_understanding":
-            student_response = message.content.get("student_response", "")
-            concept = message.content.get("concept", "")
-            
-            prompt = f"""
-            Assess this student's understanding of {concept}:
-            Student response: "{student_response}"
-            
-            Provide:
-            1. Understanding level (1-10)
-            2. Strengths identified
-            3. Misconceptions to address
-            4. Recommended next steps
-            5. Encouraging feedback
-            """
-            
-            assessment = await self._call_claude(prompt)
-            
-            return AgentMessage(
-                sender=self.agent_id,
-                recipient=message.sender,
-                message_type="assessment_response",
-                content={
-                    "assessment": assessment,
-                    "concept": concept,
-                    "recommendations": self._generate_recommendations(concept)
-                },
-                timestamp=self._get_timestamp()
-            )
+    async def _handle_explain_concept(self, message: AgentMessage) -> AgentMessage:
+        """Generate an educational explanation of a concept."""
+        concept = message.content.get("concept", "quantum superposition")
+        level = message.content.get("level", "beginner")
+        
+        prompt = _EXPLAIN.render({"concept": concept, "level": level})
+        
+        response = await self._call_claude(prompt)
+        
+        return AgentMessage(
+            sender=self.agent_id,
+            recipient=message.sender,
+            message_type="explanation_response",
+            content={
+                "explanation": response,
+                "concept": concept,
+                "level": level,
+                "pedagogical_approach": "constructivist"
+            },
+            timestamp=self._get_timestamp()
+        )
+    
+    async def _handle_assess_understanding(self, message: AgentMessage) -> AgentMessage:
+        """Assess a student's understanding of a concept."""
+        student_response = message.content.get("student_response", "")
+        concept = message.content.get("concept", "")
+        
+        prompt = _ASSESS.render({"concept": concept, "student_response": student_response})
+        
+        assessment = await self._call_claude(prompt)
+        
+        return AgentMessage(
+            sender=self.agent_id,
+            recipient=message.sender,
+            message_type="assessment_response",
+            content={
+                "assessment": assessment,
+                "concept": concept,
+                "recommendations": self._generate_recommendations(concept)
+            },
+            timestamp=self._get_timestamp()
+        )
     
     async def collaborate(self, other_agents: List[QuantumAgent], task: Dict[str, Any]) -> Dict[str, Any]:
         """Collaborate on educational content creation."""
@@ -154,11 +450,15 @@ class TeacherAgent(QuantumAgent):
                 content=task,
                 timestamp=self._get_timestamp()
             )
-            analysis_response = await debugger_agent.process_message(analysis_msg)
+            # Start the analysis before building the task-only part of the
+            # content prompt, which does not depend on it
+            analysis_task = asyncio.create_task(self.send_message(debugger_agent, analysis_msg))
+            prompt_head = _EDU_CONTENT_PREFIX.fragment({"circuit": task.get("circuit", {})})
+            analysis_response = await analysis_task
             
             # Create educational content based on analysis
             educational_content = await self._create_educational_content(
-                task, analysis_response.content
+                task, analysis_response.content, prompt_head
             )
             
             return {
@@ -167,20 +467,16 @@ class TeacherAgent(QuantumAgent):
                 "agents_involved": [self.agent_id, debugger_agent.agent_id]
             }
     
-    async def _create_educational_content(self, task: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
-        """Create educational content based on circuit analysis."""
-        prompt = f"""
-        Create educational content for this quantum circuit:
-        Circuit: {task.get('circuit', {})}
-        Analysis: {analysis}
+    async def _create_educational_content(self, task: Dict[str, Any], analysis: Dict[str, Any],
+                                          prompt_head: Optional[bytes] = None) -> Dict[str, Any]:
+        """Create educational content based on circuit analysis.
         
-        Include:
-        1. Step-by-step explanation
-        2. Key concepts highlighted
-        3. Common mistakes to avoid
-        4. Practice exercises
-        5. Advanced extensions
+        prompt_head is the template already rendered up to the analysis, if
+        the caller prepared it ahead of time.
         """
+        if prompt_head is None:
+            prompt_head = _EDU_CONTENT_PREFIX.fragment({"circuit": task.get("circuit", {})})
+        prompt = b'"%b%b%b"' % (prompt_head, _json_fragment(str(analysis)), _EDU_CONTENT_SUFFIX)
         
         content = await self._call_claude(prompt)
         return {"content": content, "difficulty_level": "adaptive"}
@@ -188,65 +484,57 @@ class TeacherAgent(QuantumAgent):
 class DebuggerAgent(QuantumAgent):
     """Debugging agent specializing in quantum circuit analysis and error detection."""
     
+    _HANDLERS = {
+        "analyze_circuit": "_handle_analyze_circuit",
+        "debug_error": "_handle_debug_error",
+    }
+    
     def __init__(self, agent_id: str = "debugger_001"):
         super().__init__(agent_id, AgentRole.DEBUGGER)
         self.capabilities = ["error_detection", "optimization", "analysis"]
         
-    async def process_message(self, message: AgentMessage) -> AgentMessage:
-        """Analyze quantum circuits for errors and optimizations."""
-        if message.message_type == "analyze_circuit":
-            circuit = message.content.get("circuit", {})
-            
-            # Analyze circuit for common issues
-            analysis = await self._analyze_circuit(circuit)
-            
-            return AgentMessage(
-                sender=self.agent_id,
-                recipient=message.sender,
-                message_type="analysis_response",
-                content={
-                    "analysis": analysis,
-                    "errors_found": analysis.get("errors", []),
-                    "optimizations": analysis.get("optimizations", []),
-                    "complexity_score": analysis.get("complexity", 0)
-                },
-                timestamp=self._get_timestamp()
-            )
-            
-        elif message.message_type == "debug_error":
-            error = message.content.get("error", "")
-            circuit = message.content.get("circuit", {})
-            
-            debug_info = await self._debug_specific_error(error, circuit)
-            
-            return AgentMessage(
-                sender=self.agent_id,
-                recipient=message.sender,
-                message_type="debug_response",
-                content={
-                    "debug_info": debug_info,
-                    "suggested_fixes": debug_info.get("fixes", []),
-                    "prevention_tips": debug_info.get("prevention", [])
-                },
-                timestamp=self._get_timestamp()
-            )
+    async def _handle_analyze_circuit(self, message: AgentMessage) -> AgentMessage:
+        """Analyze a circuit for errors and optimizations."""
+        circuit = message.content.get("circuit", {})
+        
+        # Analyze circuit for common issues
+        analysis = await self._analyze_circuit(circuit)
+        
+        return AgentMessage(
+            sender=self.agent_id,
+            recipient=message.sender,
+            message_type="analysis_response",
+            content={
+                "analysis": analysis,
+                "errors_found": analysis.get("errors", []),
+                "optimizations": analysis.get("optimizations", []),
+                "complexity_score": analysis.get("complexity", 0)
+            },
+            timestamp=self._get_timestamp()
+        )
     
-    async def _analyze_circuit(self, circuit: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze quantum circuit for issues and optimizations."""
-        prompt = f"""
-        Analyze this quantum circuit for potential issues:
-        Circuit: {circuit}
+    async def _handle_debug_error(self, message: AgentMessage) -> AgentMessage:
+        """Debug a specific error reported for a circuit."""
+        error = message.content.get("error", "")
+        circuit = message.content.get("circuit", {})
         
-        Check for:
-        1. Gate compatibility
-        2. Qubit connectivity
-        3. Circuit depth optimization
-        4. Measurement issues
-        5. Entanglement patterns
-        6. Decoherence considerations
+        debug_info = await self._debug_specific_error(error, circuit)
         
-        Provide specific recommendations.
-        """
+        return AgentMessage(
+            sender=self.agent_id,
+            recipient=message.sender,
+            message_type="debug_response",
+            content={
+                "debug_info": debug_info,
+                "suggested_fixes": debug_info.get("fixes", []),
+                "prevention_tips": debug_info.get("prevention", [])
+            },
+            timestamp=self._get_timestamp()
+        )
+    
+    async def _analyze_circuit(self, circuit: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze quantum circuit for issues and optimizations."""
+        prompt = _ANALYZE_CIRCUIT.render({"circuit": circuit})
         
         analysis = await self._call_claude(prompt)
         return {
@@ -255,34 +543,71 @@ class DebuggerAgent(QuantumAgent):
             "optimizations": self._extract_optimizations(analysis),
             "complexity": self._calculate_complexity(circuit)
         }
+    
+    def _extract_errors(self, analysis: str) -> List[str]:
+        """Pull the lines of Claude's analysis that report problems."""
+        return _matching_lines(analysis, _ERROR_MARKERS)
+    
+    def _extract_optimizations(self, analysis: str) -> List[str]:
+        """Pull the lines of Claude's analysis that suggest improvements."""
+        return _matching_lines(analysis, _OPTIMIZATION_MARKERS)
+    
+    def _calculate_complexity(self, circuit: Dict[str, Any]) -> int:
+        """Score a circuit as its depth plus the number of two-qubit gates."""
+        gates = circuit.get("gates", [])
+        if not gates:
+            return 0
+        
+        # Lay the gate list out as flat arrays for the kernel
+        count = len(gates)
+        qubits = np.fromiter((g.get("qubit", 0) for g in gates), dtype=np.int64, count=count)
+        # A missing or explicit None target marks a one-qubit gate
+        targets = np.fromiter((_target_index(g) for g in gates), dtype=np.int64, count=count)
+        n_qubits = int(max(qubits.max(), targets.max())) + 1
+        
+        # Small circuits are not worth the one-off JIT compile
+        kernel = _depth_and_entanglers_jit if count >= _JIT_MIN_GATES else _depth_and_entanglers
+        depth, entanglers = kernel(qubits, targets, n_qubits)
+        return int(depth + entanglers)
 
 class OptimizerAgent(QuantumAgent):
     """Optimization agent specializing in quantum circuit performance enhancement."""
     
+    _HANDLERS = {
+        "optimize_circuit": "_handle_optimize_circuit",
+    }
+    
     def __init__(self, agent_id: str = "optimizer_001"):
         super().__init__(agent_id, AgentRole.OPTIMIZER)
         self.capabilities = ["optimization", "performance", "scalability"]
         
-    async def process_message(self, message: AgentMessage) -> AgentMessage:
-        """Optimize quantum circuits for better performance."""
-        if message.message_type == "optimize_circuit":
-            circuit = message.content.get("circuit", {})
-            constraints = message.content.get("constraints", {})
-            
-            optimization = await self._optimize_circuit(circuit, constraints)
-            
-            return AgentMessage(
-                sender=self.agent_id,
-                recipient=message.sender,
-                message_type="optimization_response",
-                content={
-                    "optimized_circuit": optimization.get("circuit", circuit),
-                    "improvements": optimization.get("improvements", []),
-                    "performance_gains": optimization.get("gains", {}),
-                    "optimization_techniques": optimization.get("techniques", [])
-                },
-                timestamp=self._get_timestamp()
-            )
+    async def _handle_optimize_circuit(self, message: AgentMessage) -> AgentMessage:
+        """Optimize a circuit for better performance."""
+        circuit = message.content.get("circuit", {})
+        constraints = message.content.get("constraints", {})
+        
+        optimization = await self._optimize_circuit(circuit, constraints)
+        
+        return AgentMessage(
+            sender=self.agent_id,
+            recipient=message.sender,
+            message_type="optimization_response",
+            content={
+                "optimized_circuit": optimization.get("circuit", circuit),
+                "improvements": optimization.get("improvements", []),
+                "performance_gains": optimization.get("gains", {}),
+                "optimization_techniques": optimization.get("techniques", [])
+            },
+            timestamp=self._get_timestamp()
+        )
+    
+# Agents needed per task type; anything else goes to the teacher agent
+_ROUTES = {
+    "educational_explanation": ["teacher_001", "debugger_001"],
+    "circuit_optimization": ["debugger_001", "optimizer_001"],
+    "complex_analysis": ["teacher_001", "debugger_001", "optimizer_001"],
+}
+_DEFAULT_ROUTE = ["teacher_001"]
 
 class MultiAgentOrchestrator:
     """Orchestrates collaboration between multiple quantum agents."""
@@ -295,102 +620,196 @@ class MultiAgentOrchestrator:
         """Register an agent in the system."""
         self.agents[agent.agent_id] = agent
         
-    async def orchestrate_collaboration(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        """Orchestrate multi-agent collaboration on a task."""
-        print(f"🤖 Orchestrating collaboration for task: {task.get('type', 'unknown')}")
+    async def orchestrate_collaboration(self, task: Dict[str, Any], as_bytes: bool = False):
+        """Orchestrate multi-agent collaboration on a task.
+        
+        With as_bytes=True the summary comes back JSON-encoded, ready to be
+        written straight to a response.
+        """
+        logger.info("🤖 Orchestrating collaboration for task: %s", task.get('type', 'unknown'))
         
         # Determine which agents are needed
         required_agents = self._determine_required_agents(task)
         active_agents = [self.agents[agent_id] for agent_id in required_agents if agent_id in self.agents]
         
         if not active_agents:
-            return {"error": "No suitable agents available"}
-        
-        # Start collaboration
-        collaboration_results = []
+            failure = {"error": "No suitable agents available"}
+            return _encode_json(failure) if as_bytes else failure
         
-        for agent in active_agents:
+        # Agents only wait on Bedrock I/O, so run them all at once
+        async def _run_one(agent: QuantumAgent) -> AgentResult:
             try:
                 result = await agent.collaborate(active_agents, task)
-                collaboration_results.append({
-                    "agent_id": agent.agent_id,
-                    "role": agent.role.value,
-                    "result": result
-                })
+                return AgentResult(agent.agent_id, agent.role.value, result=result)
             except Exception as e:
-                print(f"❌ Agent {agent.agent_id} collaboration failed: {e}")
-                collaboration_results.append({
-                    "agent_id": agent.agent_id,
-                    "role": agent.role.value,
-                    "error": str(e)
-                })
+                logger.error("❌ Agent %s collaboration failed: %s", agent.agent_id, e)
+                return AgentResult(agent.agent_id, agent.role.value, error=str(e))
+        
+        # Fold each agent's result into the synthesis inputs as soon as it
+        # lands, keeping agent order so the output does not depend on timing
+        pending = {asyncio.ensure_future(_run_one(agent)): i for i, agent in enumerate(active_agents)}
+        collaboration_results = [None] * len(active_agents)
+        key_insights = [None] * len(active_agents)
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                i = pending.pop(finished)
+                outcome = collaboration_results[i] = finished.result()
+                key_insights[i] = {} if outcome.result is None else outcome.result
         
         # Synthesize results
-        final_result = await self._synthesize_results(collaboration_results, task)
+        final_result = await self._synthesize_results(collaboration_results, task, key_insights)
         
-        return {
+        summary = {
             "collaboration_success": True,
-            "agents_involved": [a["agent_id"] for a in collaboration_results],
+            "agents_involved": [a.agent_id for a in collaboration_results],
             "results": final_result,
             "conversation_log": self.conversation_log
         }
+        return _encode_json(summary) if as_bytes else summary
     
     def _determine_required_agents(self, task: Dict[str, Any]) -> List[str]:
         """Determine which agents are needed for a task."""
-        task_type = task.get("type", "")
-        
-        if task_type == "educational_explanation":
-            return ["teacher_001", "debugger_001"]
-        elif task_type == "circuit_optimization":
-            return ["debugger_001", "optimizer_001"]
-        elif task_type == "complex_analysis":
-            return ["teacher_001", "debugger_001", "optimizer_001"]
-        else:
-            return ["teacher_001"]  # Default to teacher agent
+        return _ROUTES.get(task.get("type", ""), _DEFAULT_ROUTE)
     
-    async def _synthesize_results(self, results: List[Dict[str, Any]], task: Dict[str, Any]) -> Dict[str, Any]:
-        """Synthesize results from multiple agents."""
-        synthesis_prompt = f"""
-        Synthesize these multi-agent collaboration results:
-        Task: {task}
-        Results: {results}
+    async def _synthesize_results(self, results: List[AgentResult], task: Dict[str, Any],
+                                  key_insights: Optional[List[Any]] = None) -> Dict[str, Any]:
+        """Synthesize results from multiple agents.
         
-        Create a comprehensive response that combines all agent insights.
+        key_insights may be passed in when it was already gathered while the
+        agents were still running.
         """
+        if key_insights is None:
+            key_insights = [{} if r.result is None else r.result for r in results]
+        
+        synthesis_prompt = _SYNTHESIS_TMPL.format_map({"task": task, "results": results})
         
         # This would call Claude to synthesize the results
         # For now, return a structured summary
         return {
             "synthesis": "Multi-agent collaboration completed successfully",
-            "key_insights": [r.get("result", {}) for r in results],
+            "key_insights": key_insights,
             "recommendations": "See individual agent results for specific recommendations"
         }
 
 # Utility functions for all agents
-async def _call_claude(prompt: str, model_id: str = "anthropic.claude-3-5-sonnet-20241022-v2:0") -> str:
-    """Call Claude model via Bedrock."""
+# At most this many Claude calls are in flight per event loop, matching the
+# worker pool the blocking path runs on
+_MAX_CLAUDE_CALLS = 16
+_claude_slots: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+async def _invoke_claude_limited(prompt: bytes, model_id: str) -> str:
+    """Call Claude for one JSON-encoded prompt, waiting for a free slot first."""
+    loop = asyncio.get_running_loop()
+    slots = _claude_slots.setdefault(loop, asyncio.Semaphore(_MAX_CLAUDE_CALLS))
+    async with slots:
+        if _aio_session() is None:
+            # boto3 is synchronous, so the call runs on a worker thread
+            return await loop.run_in_executor(_executor, _invoke_claude, prompt, model_id)
+        return await _invoke_claude_async(prompt, model_id)
+
+def _invoke_claude(prompt: bytes, model_id: str) -> str:
+    """Blocking Bedrock call for a single JSON-encoded prompt."""
+    body = _CLAUDE_BODY % prompt
+    bedrock_client = client('bedrock-runtime', 'eu-central-1')
+    response = bedrock_client.invoke_model(modelId=model_id, body=body)
+    return _completion_text(response['body'].read())
+
+async def _invoke_claude_async(prompt: bytes, model_id: str) -> str:
+    """Non-blocking Bedrock call for a single JSON-encoded prompt on the loop's aioboto3 client."""
+    bedrock = await _loop_aio_client('bedrock-runtime', 'eu-central-1')
+    response = await bedrock.invoke_model(modelId=model_id, body=_CLAUDE_BODY % prompt)
+    return _completion_text(await response['body'].read())
+
+# Most recently used completions keyed by a digest of (model_id, prompt);
+# repeated prompts skip Bedrock. The disk cache, if any, holds the rest
+_CLAUDE_MEMO_SIZE = 256
+_claude_memo: OrderedDict = OrderedDict()
+
+# Same keys, for requests still waiting on Bedrock
+_inflight: Dict[bytes, asyncio.Future] = {}
+
+@lru_cache(maxsize=1)
+def _claude_disk_cache():
+    """Persistent completion cache shared across runs, if diskcache is installed."""
     try:
-        bedrock_client = boto3.client('bedrock-runtime', region_name='eu-central-1')
-        response = bedrock_client.invoke_model(
-            modelId=model_id,
-            body=json.dumps({
-                'prompt': prompt,
-                'max_tokens': 1000,
-                'temperature': 0.7
-            })
-        )
-        return json.loads(response['body'].read())['completion']
-    except Exception as e:
-        return f"Error calling Claude: {e}"
+        import diskcache
+    except ImportError:
+        return None
+    return diskcache.Cache(os.path.expanduser("~/.cache/quantumviz/claude"))
+
+_CLAUDE_MODEL_ID = "anthropic.claude-3-5-sonnet-20241022-v2:0"
+
+def _claude_key(model_id: str, prompt: bytes) -> bytes:
+    return hashlib.blake2b(b"%b|%b" % (model_id.encode("utf-8"), prompt), digest_size=16).digest()
+
+def _cached_completion(key: bytes) -> Optional[str]:
+    """Look a completion up in memory, then on disk."""
+    if key in _claude_memo:
+        _claude_memo.move_to_end(key)
+        return _claude_memo[key]
+    
+    disk = _claude_disk_cache()
+    if disk is not None:
+        cached = disk.get(key)
+        if cached is not None:
+            _memo_put(key, cached)
+            return cached
+    return None
+
+def _memo_put(key: bytes, completion: str):
+    _claude_memo[key] = completion
+    if len(_claude_memo) > _CLAUDE_MEMO_SIZE:
+        _claude_memo.popitem(last=False)
+
+def _remember(key: bytes, completion: str):
+    _memo_put(key, completion)
+    disk = _claude_disk_cache()
+    if disk is not None:
+        disk.set(key, completion)
+
+async def _call_claude(prompt: Union[str, bytes], model_id: str = _CLAUDE_MODEL_ID) -> str:
+    """Call Claude model via Bedrock, reusing earlier completions of the same prompt.
+    
+    prompt is either plain text or a JSON string already rendered by a
+    _PromptTemplate.
+    """
+    if isinstance(prompt, str):
+        prompt = _dumps(prompt)
+    key = _claude_key(model_id, prompt)
+    cached = _cached_completion(key)
+    if cached is not None:
+        return cached
+    
+    # Piggyback on an identical request that is already on its way to Bedrock
+    pending = _inflight.get(key)
+    if pending is not None:
+        return await pending
+    
+    pending = _inflight[key] = asyncio.get_running_loop().create_future()
+    try:
+        try:
+            completion = await _invoke_claude_limited(prompt, model_id)
+        except Exception as e:
+            completion = f"Error calling Claude: {e}"
+        else:
+            # Only successful completions are cached
+            _remember(key, completion)
+        pending.set_result(completion)
+        return completion
+    finally:
+        del _inflight[key]
+        if not pending.done():
+            pending.cancel()
 
 def _get_timestamp() -> str:
     """Get current timestamp."""
-    from datetime import datetime
     return datetime.now().isoformat()
 
 # Demo function
 async def demo_multi_agent_collaboration():
     """Demonstrate multi-agent collaboration."""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     print("🤖 QuantumViz Agent - Multi-Agent Collaboration Demo")
     print("=" * 60)
     
@@ -421,11 +840,14 @@ async def demo_multi_agent_collaboration():
         }
     ]
     
-    for i, task in enumerate(tasks, 1):
-        print(f"\n🎯 Task {i}: {task['type']}")
-        result = await orchestrator.orchestrate_collaboration(task)
-        print(f"✅ Collaboration Result: {result.get('collaboration_success', False)}")
-        print(f"🤖 Agents Involved: {result.get('agents_involved', [])}")
+    try:
+        for i, task in enumerate(tasks, 1):
+            print(f"\n🎯 Task {i}: {task['type']}")
+            result = await orchestrator.orchestrate_collaboration(task)
+            print(f"✅ Collaboration Result: {result.get('collaboration_success', False)}")
+            print(f"🤖 Agents Involved: {result.get('agents_involved', [])}")
+    finally:
+        await close_aio_clients()
 
 if __name__ == "__main__":
     asyncio.run(demo_multi_agent_collaboration())
@@ -4,13 +4,34 @@ QuantumViz Agent - AI-Powered Quantum Debugger
 Advanced AI assistant for quantum circuit debugging, optimization, and error detection.
 """
 
-import boto3
+import asyncio
+import copy
+import hashlib
 import json
+import os
+import sys
 import numpy as np
+from collections import Counter, OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import re
+# Add parent directory to path to import the shared AWS clients
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aws_clients import client, supports_param
+
+# Gate sets used by the checks; the arrays are the same sets in np.isin form
+VALID_GATES = frozenset({'H', 'X', 'Y', 'Z', 'CNOT', 'CZ', 'SWAP', 'T', 'S', 'RX', 'RY', 'RZ'})
+TWO_QUBIT_GATES = frozenset({'CNOT', 'CZ', 'SWAP'})
+PAULI_GATES = frozenset({'H', 'X', 'Y', 'Z'})
+MEAS_GATES = frozenset({'measure', 'M'})
+
+_VALID_GATES_ARR = np.array(sorted(VALID_GATES))
+_TWO_QUBIT_GATES_ARR = np.array(sorted(TWO_QUBIT_GATES))
+_PAULI_GATES_ARR = np.array(sorted(PAULI_GATES))
+_MEAS_GATES_ARR = np.array(sorted(MEAS_GATES))
+_VALID_GATES_HINT = "Use one of: H, X, Y, Z, CNOT, CZ, SWAP, T, S, RX, RY, RZ"
 
 class ErrorType(Enum):
     GATE_COMPATIBILITY = "gate_compatibility"
@@ -30,15 +51,129 @@ class QuantumError:
     suggestion: str
     fix: str
 
+# Severity codes used by the score kernel; unknown severities count as low
+_SEVERITY_CODES = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+_SEVERITY_PENALTIES = np.array([5, 10, 15, 20], dtype=np.int64)
+
+def _score_kernel(severity_codes, opt_count, complexity):
+    """Debug score from error severity codes, optimization count and complexity."""
+    base = 100
+    for code in severity_codes:
+        base -= _SEVERITY_PENALTIES[code]
+    base += opt_count * 5
+    if complexity > 50:
+        base -= 10
+    return max(0, min(100, base))
+
+try:
+    from numba import njit
+    _score_kernel_jit = njit(cache=True)(_score_kernel)
+except ImportError:
+    _score_kernel_jit = _score_kernel
+
+# Error count from which compiling the kernel pays for itself
+_JIT_MIN_ERRORS = 64
+
+class ErrorTable:
+    """Detected errors stored column by column.
+    
+    QuantumError objects are only built when the caller asks for them.
+    """
+    
+    __slots__ = ("error_types", "severities", "severity_codes", "descriptions", "locations",
+                 "suggestions", "fixes")
+    
+    def __init__(self):
+        self.error_types: List[ErrorType] = []
+        self.severities: List[str] = []
+        self.severity_codes: List[int] = []
+        self.descriptions: List[str] = []
+        self.locations: List[Dict[str, Any]] = []
+        self.suggestions: List[str] = []
+        self.fixes: List[str] = []
+    
+    def __len__(self) -> int:
+        return len(self.severities)
+    
+    def append(self, error_type: ErrorType, severity: str, description: str,
+               location: Dict[str, Any], suggestion: str, fix: str):
+        self.error_types.append(error_type)
+        self.severities.append(severity)
+        self.severity_codes.append(_SEVERITY_CODES.get(severity, 0))
+        self.descriptions.append(description)
+        self.locations.append(location)
+        self.suggestions.append(suggestion)
+        self.fixes.append(fix)
+    
+    def to_errors(self) -> List[QuantumError]:
+        # Tables are cached and reused, so each error gets its own location dict
+        return [QuantumError(error_type, severity, description, dict(location), suggestion, fix)
+                for error_type, severity, description, location, suggestion, fix in zip(
+                    self.error_types, self.severities, self.descriptions,
+                    self.locations, self.suggestions, self.fixes)]
+
+@dataclass
+class CircuitSoA:
+    """Gate list stored as parallel arrays; missing targets are -1.
+    
+    qubit_masks holds one bit per qubit a gate touches, so adjacent gates on
+    disjoint qubits can be ruled out with a single AND.
+    """
+    types: np.ndarray
+    qubits: np.ndarray
+    targets: np.ndarray
+    qubit_masks: np.ndarray
+    n: int
+    
+    def repeats(self) -> np.ndarray:
+        """Indices of gates that repeat the previous gate's type on the same qubit."""
+        # Only adjacent pairs sharing a qubit can repeat each other
+        shared = np.flatnonzero(self.qubit_masks[1:] & self.qubit_masks[:-1])
+        same = (self.types[shared + 1] == self.types[shared]) & (self.qubits[shared + 1] == self.qubits[shared])
+        return shared[same] + 1
+    
+    def digest(self) -> bytes:
+        """Structural hash of the circuit; equal gate sequences give equal digests."""
+        h = hashlib.blake2b(self.types.dtype.str.encode(), digest_size=16)
+        for column in (self.types, self.qubits, self.targets):
+            h.update(column.tobytes())
+        return h.digest()
+
+def _qubit_bits(indices: np.ndarray) -> np.ndarray:
+    """One-hot uint64 per qubit index; indices outside 0-63 set every bit."""
+    bits = np.full(indices.shape, np.iinfo(np.uint64).max, dtype=np.uint64)
+    in_range = (indices >= 0) & (indices < 64)
+    bits[in_range] = np.left_shift(np.uint64(1), indices[in_range].astype(np.uint64))
+    return bits
+
+def _to_soa(gates: List[Dict[str, Any]]) -> CircuitSoA:
+    """Convert gate dicts to a CircuitSoA in a single pass over the list."""
+    n = len(gates)
+    types = np.array([g.get('type', '') for g in gates], dtype=str)
+    qubits = np.fromiter((g.get('qubit', 0) for g in gates), dtype=np.int64, count=n)
+    targets = np.fromiter(
+        (-1 if g.get('target') is None else g['target'] for g in gates), dtype=np.int64, count=n
+    )
+    qubit_masks = _qubit_bits(qubits)
+    has_target = targets >= 0
+    qubit_masks[has_target] |= _qubit_bits(targets[has_target])
+    return CircuitSoA(types, qubits, targets, qubit_masks, n)
+
 class QuantumDebugger:
     """AI-powered quantum circuit debugger and optimizer."""
     
+    # Per-circuit pass results kept for repeat debugging of the same circuit
+    _CACHE_SIZE = 256
+    
     def __init__(self, region: str = "eu-central-1"):
         self.region = region
-        self.bedrock_client = boto3.client('bedrock-runtime', region_name=region)
+        self.bedrock_client = client('bedrock-runtime', region)
         self.debug_history = []
         self.max_history_size = 100  # Keep last 100 debug sessions
-    self.optimization_rules = self._load_optimization_rules()
+        self.optimization_rules = self._load_optimization_rules()
+        self._latency_optimized = True
+        self._analysis_cache: OrderedDict = OrderedDict()
+        self._error_cache: OrderedDict = OrderedDict()
         
     def _load_optimization_rules(self) -> Dict[str, Any]:
         """Load quantum circuit optimization rules."""
@@ -60,6 +195,59 @@ class QuantumDebugger:
     
     async def debug_circuit(self, circuit: Dict[str, Any], user_level: str = "intermediate") -> Dict[str, Any]:
         """Comprehensive quantum circuit debugging."""
+        soa, key, circuit_analysis = self._prepare(circuit)
+        
+        # 5. AI explanation; the Bedrock call is submitted to a worker thread
+        # now, so it is in flight while the remaining passes run on this one
+        explanation = self._start_ai_explanation(circuit, circuit_analysis, user_level)
+        
+        debug_results = self._cpu_passes(circuit, user_level, soa, key, circuit_analysis)
+        debug_results["ai_explanation"] = await explanation
+        
+        self._record(circuit, debug_results)
+        return debug_results
+    
+    async def debug_circuits_batch(self, circuits: List[Dict[str, Any]], user_levels: Optional[List[str]] = None,
+                                   max_concurrency: int = 8) -> List[Dict[str, Any]]:
+        """Debug several circuits, keeping up to max_concurrency Bedrock calls in flight."""
+        if user_levels is None:
+            user_levels = ["intermediate"] * len(circuits)
+        
+        # The pool size caps the calls in flight; every call is queued on it
+        # before the local passes start
+        executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="bedrock")
+        try:
+            prepared = [self._prepare(c) for c in circuits]
+            explanations = [
+                self._start_ai_explanation(c, analysis, level, executor)
+                for c, (_, _, analysis), level in zip(circuits, prepared, user_levels)
+            ]
+            
+            # The analysis passes share the result caches, so they stay on this
+            # thread and run while the explanations are in flight
+            batch_results = [
+                self._cpu_passes(c, level, *parts) for c, level, parts in zip(circuits, user_levels, prepared)
+            ]
+            
+            for circuit, debug_results, explanation in zip(circuits, batch_results, await asyncio.gather(*explanations)):
+                debug_results["ai_explanation"] = explanation
+                self._record(circuit, debug_results)
+        finally:
+            executor.shutdown(wait=False)
+        return batch_results
+    
+    def _prepare(self, circuit: Dict[str, Any]) -> Tuple[CircuitSoA, bytes, Dict[str, Any]]:
+        """Convert the circuit to columns and run the structure analysis the prompt needs."""
+        # Every pass reads the same columnar copy of the gates
+        soa = _to_soa(circuit.get('gates', []))
+        key = soa.digest()
+        
+        # 1. Analyze circuit structure
+        return soa, key, self._analyze_circuit_structure(soa, key)
+    
+    def _cpu_passes(self, circuit: Dict[str, Any], user_level: str, soa: CircuitSoA, key: bytes,
+                    circuit_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the remaining local passes; the AI explanation is filled in by the caller."""
         print(f"🔍 AI Quantum Debugger - Analyzing Circuit")
         print(f"   User Level: {user_level}")
         print(f"   Circuit Gates: {len(circuit.get('gates', []))}")
@@ -74,30 +262,27 @@ class QuantumDebugger:
             "debug_score": 0
         }
         
-        # 1. Analyze circuit structure
-        circuit_analysis = await self._analyze_circuit_structure(circuit)
         debug_results["circuit_analysis"] = circuit_analysis
         
         # 2. Detect errors
-        errors = await self._detect_errors(circuit, circuit_analysis)
-        debug_results["errors_found"] = errors
+        errors = self._detect_errors(soa, circuit_analysis, key)
+        debug_results["errors_found"] = errors.to_errors()
         
         # 3. Find optimizations
-        optimizations = await self._find_optimizations(circuit, circuit_analysis)
+        optimizations = self._find_optimizations(soa, circuit_analysis)
         debug_results["optimizations"] = optimizations
         
         # 4. Generate suggestions
-        suggestions = await self._generate_suggestions(circuit, errors, optimizations, user_level)
+        suggestions = self._generate_suggestions(circuit, errors, optimizations, user_level)
         debug_results["suggestions"] = suggestions
         
-        # 5. AI explanation
-        ai_explanation = await self._generate_ai_explanation(circuit, errors, optimizations, user_level)
-        debug_results["ai_explanation"] = ai_explanation
-        
         # 6. Calculate debug score
         debug_score = self._calculate_debug_score(circuit_analysis, errors, optimizations)
         debug_results["debug_score"] = debug_score
         
+        return debug_results
+    
+    def _record(self, circuit: Dict[str, Any], debug_results: Dict[str, Any]):
         # Store in history and cleanup old entries
         self.debug_history.append({
         "circuit": circuit,
@@ -108,15 +293,17 @@ class QuantumDebugger:
         # Keep only the most recent entries
         if len(self.debug_history) > self.max_history_size:
             self.debug_history = self.debug_history[-self.max_history_size:]
-
-        return debug_results
     
-    async def _analyze_circuit_structure(self, circuit: Dict[str, Any]) -> Dict[str, Any]:
+    def _analyze_circuit_structure(self, soa: CircuitSoA, key: Optional[bytes] = None) -> Dict[str, Any]:
         """Analyze the structure of the quantum circuit."""
-        gates = circuit.get('gates', [])
+        key = key or soa.digest()
+        # Callers get deep copies so they never share the cached sets and lists
+        cached = self._cache_get(self._analysis_cache, key)
+        if cached is not None:
+            return copy.deepcopy(cached)
         
         analysis = {
-            "total_gates": len(gates),
+            "total_gates": soa.n,
             "gate_types": {},
             "qubit_usage": set(),
             "circuit_depth": 0,
@@ -125,208 +312,197 @@ class QuantumDebugger:
             "complexity_score": 0
         }
         
-        # Analyze each gate
-        for gate in gates:
-            gate_type = gate.get('type', '')
-            qubit = gate.get('qubit', 0)
-            target = gate.get('target')
-            
-            # Count gate types
-            analysis["gate_types"][gate_type] = analysis["gate_types"].get(gate_type, 0) + 1
-            
-            # Track qubit usage
-            analysis["qubit_usage"].add(qubit)
-            if target is not None:
-                analysis["qubit_usage"].add(target)
-            
-            # Count measurements
-            if gate_type in ['measure', 'M']:
-                analysis["measurement_gates"] += 1
-            
-            # Track entanglement
-            if gate_type in ['CNOT', 'CZ', 'SWAP']:
-                analysis["entanglement_patterns"].append({
-                    "type": gate_type,
-                    "qubits": [qubit, target] if target is not None else [qubit]
-                })
+        types, qubits, targets = soa.types, soa.qubits, soa.targets
+        
+        # Gate type counts, listed in order of first appearance
+        gate_types, first_seen, counts = np.unique(types, return_index=True, return_counts=True)
+        order = np.argsort(first_seen)
+        analysis["gate_types"] = dict(zip(gate_types[order].tolist(), counts[order].tolist()))
+        
+        analysis["qubit_usage"] = set(np.unique(np.concatenate([qubits, targets[targets >= 0]])).tolist())
+        analysis["measurement_gates"] = int(np.isin(types, _MEAS_GATES_ARR).sum())
+        
+        # Track entanglement
+        entangling = np.flatnonzero(np.isin(types, _TWO_QUBIT_GATES_ARR))
+        analysis["entanglement_patterns"] = [
+            {"type": gate_type, "qubits": [qubit, target] if target >= 0 else [qubit]}
+            for gate_type, qubit, target in zip(
+                types[entangling].tolist(), qubits[entangling].tolist(), targets[entangling].tolist()
+            )
+        ]
         
         # Calculate complexity
         analysis["complexity_score"] = self._calculate_complexity_score(analysis)
         analysis["qubit_count"] = len(analysis["qubit_usage"])
         
-        return analysis
+        self._cache_put(self._analysis_cache, key, analysis)
+        return copy.deepcopy(analysis)
     
-    async def _detect_errors(self, circuit: Dict[str, Any], analysis: Dict[str, Any]) -> List[QuantumError]:
+    def _detect_errors(self, soa: CircuitSoA, analysis: Dict[str, Any],
+                       key: Optional[bytes] = None) -> ErrorTable:
         """Detect errors in the quantum circuit."""
-        errors = []
-        gates = circuit.get('gates', [])
+        key = key or soa.digest()
+        cached = self._cache_get(self._error_cache, key)
+        if cached is not None:
+            return cached
+        
+        # Every check appends to the same table
+        errors = ErrorTable()
         
         # 1. Gate compatibility errors
-        compatibility_errors = await self._check_gate_compatibility(gates)
-        errors.extend(compatibility_errors)
+        self._check_gate_compatibility(soa, errors)
         
         # 2. Qubit connectivity errors
-        connectivity_errors = await self._check_qubit_connectivity(gates, analysis)
-        errors.extend(connectivity_errors)
+        self._check_qubit_connectivity(soa, analysis, errors)
         
         # 3. Circuit depth warnings
-        depth_errors = await self._check_circuit_depth(analysis)
-        errors.extend(depth_errors)
+        self._check_circuit_depth(analysis, errors)
         
         # 4. Measurement errors
-        measurement_errors = await self._check_measurement_errors(gates)
-        errors.extend(measurement_errors)
+        self._check_measurement_errors(soa, errors)
         
         # 5. Entanglement issues
-        entanglement_errors = await self._check_entanglement_patterns(analysis)
-        errors.extend(entanglement_errors)
+        self._check_entanglement_patterns(analysis, errors)
         
+        self._cache_put(self._error_cache, key, errors)
         return errors
     
-    async def _check_gate_compatibility(self, gates: List[Dict[str, Any]]) -> List[QuantumError]:
+    def _cache_get(self, cache: OrderedDict, key: bytes):
+        """Return a cached pass result and mark it recently used."""
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+    
+    def _cache_put(self, cache: OrderedDict, key: bytes, value):
+        cache[key] = value
+        if len(cache) > self._CACHE_SIZE:
+            cache.popitem(last=False)
+    
+    def _check_gate_compatibility(self, soa: CircuitSoA, errors: ErrorTable):
         """Check for gate compatibility issues."""
-        errors = []
-        
-        for i, gate in enumerate(gates):
-            gate_type = gate.get('type', '')
-            qubit = gate.get('qubit', 0)
+        invalid = ~np.isin(soa.types, _VALID_GATES_ARR)
+        repeated = np.zeros(soa.n, dtype=bool)
+        repeated[soa.repeats()] = True
+        repeated &= np.isin(soa.types, _PAULI_GATES_ARR)
+        
+        # Only gates that failed one of the bulk checks need an error built
+        for i in np.flatnonzero(invalid | repeated).tolist():
+            gate_type = str(soa.types[i])
+            qubit = int(soa.qubits[i])
             
             # Check for invalid gate types
-            valid_gates = ['H', 'X', 'Y', 'Z', 'CNOT', 'CZ', 'SWAP', 'T', 'S', 'RX', 'RY', 'RZ']
-            if gate_type not in valid_gates:
-                errors.append(QuantumError(
+            if invalid[i]:
+                errors.append(
                     error_type=ErrorType.GATE_COMPATIBILITY,
                     severity="high",
                     description=f"Invalid gate type: {gate_type}",
                     location={"gate_index": i, "qubit": qubit},
-                    suggestion=f"Use one of: {', '.join(valid_gates)}",
+                    suggestion=_VALID_GATES_HINT,
                     fix=f"Replace {gate_type} with a valid gate"
-                ))
+                )
             
             # Check for consecutive identical gates
-            if i > 0 and gates[i-1].get('type') == gate_type and gates[i-1].get('qubit') == qubit:
-                if gate_type in ['H', 'X', 'Y', 'Z']:
-                    errors.append(QuantumError(
-                        error_type=ErrorType.OPTIMIZATION,
-                        severity="medium",
-                        description=f"Consecutive {gate_type} gates on qubit {qubit}",
-                        location={"gate_index": i, "qubit": qubit},
-                        suggestion="These gates can be optimized or removed",
-                        fix=f"Remove one of the consecutive {gate_type} gates"
-                    ))
-        
-        return errors
+            if repeated[i]:
+                errors.append(
+                    error_type=ErrorType.OPTIMIZATION,
+                    severity="medium",
+                    description=f"Consecutive {gate_type} gates on qubit {qubit}",
+                    location={"gate_index": i, "qubit": qubit},
+                    suggestion="These gates can be optimized or removed",
+                    fix=f"Remove one of the consecutive {gate_type} gates"
+                )
     
-    async def _check_qubit_connectivity(self, gates: List[Dict[str, Any]], analysis: Dict[str, Any]) -> List[QuantumError]:
+    def _check_qubit_connectivity(self, soa: CircuitSoA, analysis: Dict[str, Any], errors: ErrorTable):
         """Check for qubit connectivity issues."""
-        errors = []
+        has_target = soa.targets >= 0
+        missing_target = np.isin(soa.types, _TWO_QUBIT_GATES_ARR) & ~has_target
+        
+        max_qubit = max(analysis["qubit_usage"]) if analysis["qubit_usage"] else 0
+        out_of_range = (soa.qubits > max_qubit) | (has_target & (soa.targets > max_qubit))
         
-        for i, gate in enumerate(gates):
-            gate_type = gate.get('type', '')
-            qubit = gate.get('qubit', 0)
-            target = gate.get('target')
+        for i in np.flatnonzero(missing_target | out_of_range).tolist():
+            gate_type = str(soa.types[i])
+            qubit = int(soa.qubits[i])
+            target = int(soa.targets[i]) if has_target[i] else None
             
             # Check for two-qubit gates without target
-            if gate_type in ['CNOT', 'CZ', 'SWAP'] and target is None:
-                errors.append(QuantumError(
+            if missing_target[i]:
+                errors.append(
                     error_type=ErrorType.QUBIT_CONNECTIVITY,
                     severity="critical",
                     description=f"{gate_type} gate missing target qubit",
                     location={"gate_index": i, "qubit": qubit},
                     suggestion="Specify target qubit for two-qubit gates",
                     fix=f"Add target qubit to {gate_type} gate"
-                ))
+                )
             
             # Check for invalid qubit indices
-            max_qubit = max(analysis["qubit_usage"]) if analysis["qubit_usage"] else 0
-            if qubit > max_qubit or (target is not None and target > max_qubit):
-                errors.append(QuantumError(
+            if out_of_range[i]:
+                errors.append(
                     error_type=ErrorType.QUBIT_CONNECTIVITY,
                     severity="high",
                     description=f"Qubit index out of range",
                     location={"gate_index": i, "qubit": qubit, "target": target},
                     suggestion="Use valid qubit indices",
                     fix="Adjust qubit indices to valid range"
-                ))
-        
-        return errors
+                )
     
-    async def _check_circuit_depth(self, analysis: Dict[str, Any]) -> List[QuantumError]:
+    def _check_circuit_depth(self, analysis: Dict[str, Any], errors: ErrorTable):
         """Check for circuit depth issues."""
-        errors = []
-        
         total_gates = analysis.get("total_gates", 0)
         max_depth = self.optimization_rules["circuit_depth"]["max_depth"]
         
         if total_gates > max_depth:
-            errors.append(QuantumError(
+            errors.append(
                 error_type=ErrorType.CIRCUIT_DEPTH,
                 severity="medium",
                 description=f"Circuit depth ({total_gates}) exceeds recommended maximum ({max_depth})",
                 location={"total_gates": total_gates},
                 suggestion="Consider circuit optimization",
                 fix="Reduce circuit depth through gate merging and optimization"
-            ))
-        
-        return errors
+            )
     
-    async def _check_measurement_errors(self, gates: List[Dict[str, Any]]) -> List[QuantumError]:
+    def _check_measurement_errors(self, soa: CircuitSoA, errors: ErrorTable):
         """Check for measurement-related errors."""
-        errors = []
-        
-        measurement_gates = [g for g in gates if g.get('type') in ['measure', 'M']]
-        
-        if not measurement_gates:
-            errors.append(QuantumError(
+        if not np.isin(soa.types, _MEAS_GATES_ARR).any():
+            errors.append(
                 error_type=ErrorType.MEASUREMENT,
                 severity="medium",
                 description="No measurement gates found",
-                location={"total_gates": len(gates)},
+                location={"total_gates": soa.n},
                 suggestion="Add measurement gates to observe results",
                 fix="Add measurement gates to qubits you want to observe"
-            ))
-        
-        return errors
+            )
     
-    async def _check_entanglement_patterns(self, analysis: Dict[str, Any]) -> List[QuantumError]:
+    def _check_entanglement_patterns(self, analysis: Dict[str, Any], errors: ErrorTable):
         """Check for entanglement pattern issues."""
-        errors = []
-        
         entanglement_patterns = analysis.get("entanglement_patterns", [])
         max_entanglement_depth = self.optimization_rules["entanglement"]["max_entanglement_depth"]
         
         if len(entanglement_patterns) > max_entanglement_depth:
-            errors.append(QuantumError(
+            errors.append(
                 error_type=ErrorType.ENTANGLEMENT,
                 severity="low",
                 description=f"High entanglement depth ({len(entanglement_patterns)})",
                 location={"entanglement_count": len(entanglement_patterns)},
                 suggestion="Consider entanglement optimization",
                 fix="Review entanglement patterns for optimization opportunities"
-            ))
-        
-        return errors
+            )
     
-    async def _find_optimizations(self, circuit: Dict[str, Any], analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _find_optimizations(self, soa: CircuitSoA, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Find optimization opportunities."""
         optimizations = []
-        gates = circuit.get('gates', [])
         
         # 1. Gate merging optimizations
-        for i in range(len(gates) - 1):
-            current_gate = gates[i]
-            next_gate = gates[i + 1]
-            
-            if (current_gate.get('type') == next_gate.get('type') and 
-                current_gate.get('qubit') == next_gate.get('qubit')):
-                
-                optimizations.append({
-                    "type": "gate_merging",
-                    "description": f"Merge consecutive {current_gate.get('type')} gates",
-                    "location": {"start": i, "end": i + 1},
-                    "savings": "1 gate reduction",
-                    "implementation": f"Remove gate at index {i + 1}"
-                })
+        for i in (soa.repeats() - 1).tolist():
+            optimizations.append({
+                "type": "gate_merging",
+                "description": f"Merge consecutive {soa.types[i]} gates",
+                "location": {"start": i, "end": i + 1},
+                "savings": "1 gate reduction",
+                "implementation": f"Remove gate at index {i + 1}"
+            })
         
         # 2. Circuit depth optimizations
         if analysis.get("total_gates", 0) > self.optimization_rules["circuit_depth"]["optimization_threshold"]:
@@ -351,8 +527,8 @@ class QuantumDebugger:
         
         return optimizations
     
-    async def _generate_suggestions(self, circuit: Dict[str, Any], errors: List[QuantumError], 
-                                  optimizations: List[Dict[str, Any]], user_level: str) -> List[str]:
+    def _generate_suggestions(self, circuit: Dict[str, Any], errors: ErrorTable, 
+                            optimizations: List[Dict[str, Any]], user_level: str) -> List[str]:
         """Generate personalized suggestions based on user level."""
         suggestions = []
         
@@ -380,8 +556,7 @@ class QuantumDebugger:
             ])
         
         # Error-based suggestions
-        critical_errors = [e for e in errors if e.severity == "critical"]
-        if critical_errors:
+        if "critical" in errors.severities:
             suggestions.append("Fix critical errors before running the circuit")
         
         # Optimization-based suggestions
@@ -390,15 +565,32 @@ class QuantumDebugger:
         
         return suggestions
     
-    async def _generate_ai_explanation(self, circuit: Dict[str, Any], errors: List[QuantumError], 
-                                     optimizations: List[Dict[str, Any]], user_level: str) -> str:
+    async def _generate_ai_explanation(self, circuit: Dict[str, Any], analysis: Dict[str, Any],
+                                       user_level: str) -> str:
         """Generate AI explanation of the debugging results."""
-        prompt = f"""
+        return await self._start_ai_explanation(circuit, analysis, user_level)
+    
+    def _start_ai_explanation(self, circuit: Dict[str, Any], analysis: Dict[str, Any], user_level: str,
+                              executor: Optional[Executor] = None) -> asyncio.Future:
+        """Submit the explanation call to a worker thread immediately and return its future."""
+        prompt = self._build_prompt(circuit, analysis, user_level)
+        return asyncio.get_running_loop().run_in_executor(executor, self._bedrock_invoke, prompt)
+    
+    def _build_prompt(self, circuit: Dict[str, Any], analysis: Dict[str, Any], user_level: str) -> str:
+        # Summarize rather than paste the gate list, which can dwarf the rest of the prompt
+        summary = (
+            f"{analysis['total_gates']} gates, {analysis['qubit_count']} qubits, "
+            f"gate_types={analysis['gate_types']}, "
+            f"entanglement_ops={len(analysis['entanglement_patterns'])}, "
+            f"measurements={analysis['measurement_gates']}"
+        )
+        if analysis['total_gates'] < 20:
+            summary = f"{summary}\n        Gates: {circuit.get('gates', [])}"
+        
+        return f"""
         As an AI quantum debugging assistant, explain the analysis of this quantum circuit:
         
-        Circuit: {circuit}
-        Errors Found: {len(errors)}
-        Optimizations Available: {len(optimizations)}
+        Circuit: {summary}
         User Level: {user_level}
         
         Provide a clear, educational explanation that:
@@ -410,35 +602,79 @@ class QuantumDebugger:
         
         Make it engaging and educational for a {user_level} user.
         """
-        
+    
+    async def stream_ai_explanation(self, circuit: Dict[str, Any], user_level: str = "intermediate"):
+        """Yield the AI explanation text chunk by chunk as Bedrock generates it."""
+        _, _, analysis = self._prepare(circuit)
+        prompt = self._build_prompt(circuit, analysis, user_level)
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        
+        def pump():
+            for text in self._bedrock_stream(prompt):
+                loop.call_soon_threadsafe(queue.put_nowait, text)
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+        
+        loop.run_in_executor(None, pump)
+        while (text := await queue.get()) is not done:
+            yield text
+    
+    def _explanation_request(self, prompt: str) -> Dict[str, Any]:
+        return dict(
+            modelId='anthropic.claude-3-5-sonnet-20241022-v2:0',
+            body=json.dumps({
+                'prompt': prompt,
+                'max_tokens': 800,
+                'temperature': 0.7
+            })
+        )
+    
+    def _call_bedrock(self, operation: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Call a Bedrock runtime operation with latency-optimized inference when available."""
+        call = getattr(self.bedrock_client, operation)
+        # Older botocore releases reject the parameter before sending anything
+        api_name = self.bedrock_client.meta.method_to_api_mapping[operation]
+        if self._latency_optimized and supports_param(self.bedrock_client, api_name, 'performanceConfigLatency'):
+            try:
+                return call(performanceConfigLatency='optimized', **request)
+            except self.bedrock_client.exceptions.ValidationException as e:
+                # Latency-optimized inference only exists for some models and
+                # regions; any other validation error is the caller's to see
+                if 'performanceconfig' not in str(e).lower():
+                    raise
+                self._latency_optimized = False
+        return call(**request)
+    
+    def _bedrock_invoke(self, prompt: str) -> str:
+        """Blocking Bedrock call for the explanation; run it off the event loop."""
         try:
-            response = self.bedrock_client.invoke_model(
-                modelId='anthropic.claude-3-5-sonnet-20241022-v2:0',
-                body=json.dumps({
-                    'prompt': prompt,
-                    'max_tokens': 800,
-                    'temperature': 0.7
-                })
-            )
+            response = self._call_bedrock('invoke_model', self._explanation_request(prompt))
             return json.loads(response['body'].read())['completion']
         except Exception as e:
             return f"AI explanation unavailable: {e}"
     
-    def _calculate_debug_score(self, analysis: Dict[str, Any], errors: List[QuantumError], 
+    def _bedrock_stream(self, prompt: str):
+        """Blocking generator over the explanation's text chunks."""
+        try:
+            response = self._call_bedrock('invoke_model_with_response_stream', self._explanation_request(prompt))
+            for event in response['body']:
+                if 'chunk' in event:
+                    yield json.loads(event['chunk']['bytes'])['completion']
+        except Exception as e:
+            yield f"AI explanation unavailable: {e}"
+    
+    def _calculate_debug_score(self, analysis: Dict[str, Any], errors: ErrorTable, 
                               optimizations: List[Dict[str, Any]]) -> int:
         """Calculate overall debug score (0-100)."""
-        base_score = 100
+        if len(errors) >= _JIT_MIN_ERRORS:
+            codes = np.array(errors.severity_codes, dtype=np.int8)
+            return int(_score_kernel_jit(codes, len(optimizations), analysis.get("complexity_score", 0)))
         
         # Deduct for errors
-        for error in errors:
-            if error.severity == "critical":
-                base_score -= 20
-            elif error.severity == "high":
-                base_score -= 15
-            elif error.severity == "medium":
-                base_score -= 10
-            else:
-                base_score -= 5
+        counts = Counter(errors.severities)
+        base_score = 100 - 20 * counts["critical"] - 15 * counts["high"] - 10 * counts["medium"]
+        base_score -= 5 * (len(errors) - counts["critical"] - counts["high"] - counts["medium"])
         
         # Add for optimizations
         base_score += len(optimizations) * 5
@@ -522,13 +758,15 @@ async def demo_quantum_debugger():
         }
     ]
     
-    for test in test_circuits:
+    # Debug all circuits at once so their Bedrock calls overlap
+    all_results = await debugger.debug_circuits_batch(
+        [test['circuit'] for test in test_circuits], [test['level'] for test in test_circuits]
+    )
+    
+    for test, debug_results in zip(test_circuits, all_results):
         print(f"\n🧪 Testing: {test['name']}")
         print(f"   Level: {test['level']}")
         
-        # Debug the circuit
-        debug_results = await debugger.debug_circuit(test['circuit'], test['level'])
-        
         print(f"   Debug Score: {debug_results['debug_score']}/100")
         print(f"   Errors Found: {len(debug_results['errors_found'])}")
         print(f"   Optimizations: {len(debug_results['optimizations'])}")
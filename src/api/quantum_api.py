@@ -20,6 +20,7 @@ import sys
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
+from aws_clients import supports_param
 
 # Configure logging
 logging.basicConfig(
@@ -70,6 +71,22 @@ visualizer = QuantumVisualizer()
 bedrock_client = boto3.client('bedrock-runtime', region_name=Config.AWS_REGION)
 s3_client = boto3.client('s3', region_name=Config.AWS_REGION)
 
+# Models that rejected latency-optimized inference; they get the standard path
+_STANDARD_LATENCY_MODELS = set()
+
+def _invoke_model(**request):
+    """invoke_model with latency-optimized inference, falling back for models without it."""
+    model_id = request['modelId']
+    if model_id not in _STANDARD_LATENCY_MODELS and \
+            supports_param(bedrock_client, 'InvokeModel', 'performanceConfigLatency'):
+        try:
+            return bedrock_client.invoke_model(performanceConfigLatency='optimized', **request)
+        except bedrock_client.exceptions.ValidationException as e:
+            if 'performanceconfig' not in str(e).lower():
+                raise
+            _STANDARD_LATENCY_MODELS.add(model_id)
+    return bedrock_client.invoke_model(**request)
+
 class QuantumAPI:
     """REST API for quantum processing."""
     
@@ -321,7 +338,7 @@ class QuantumAPI:
             """
             
             # Call Claude via Bedrock
-            response = bedrock_client.invoke_model(
+            response = _invoke_model(
                 modelId=Config.FOUNDATION_MODEL,
                 body=json.dumps({
                     'prompt': prompt,
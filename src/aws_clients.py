@@ -0,0 +1,55 @@
+"""
+QuantumViz Agent - Shared AWS Clients
+Process-wide boto3 clients and service-model checks used by every module.
+"""
+
+import functools
+import threading
+
+# Warm keep-alive connections, a pool sized for concurrent Bedrock calls and
+# adaptive client-side retries, shared by every client in the process
+CLIENT_SETTINGS = dict(
+    max_pool_connections=64,
+    retries={'max_attempts': 5, 'mode': 'adaptive'},
+    connect_timeout=3,
+    read_timeout=30,
+    tcp_keepalive=True
+)
+
+# InvokeModel/InvokeAgent and their response streams run far longer than
+# control-plane calls, so the runtime clients wait longer for each read
+_READ_TIMEOUTS = {'bedrock-runtime': 120, 'bedrock-agent-runtime': 120}
+
+def _settings(service):
+    return dict(CLIENT_SETTINGS, read_timeout=_READ_TIMEOUTS.get(service, CLIENT_SETTINGS['read_timeout']))
+
+# Sessions are not thread-safe, so clients are built one at a time
+_CLIENT_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _session():
+    """Return the default boto3 session.
+
+    boto3 is imported here so scripts that never call AWS skip its import cost.
+    """
+    import boto3
+    return boto3.session.Session()
+
+@functools.lru_cache(maxsize=None)
+def client(service, region=None, session=None):
+    """Return a boto3 client shared by every caller using the same service, region and session."""
+    from botocore.config import Config
+
+    with _CLIENT_LOCK:
+        return (session or _session()).client(service, region_name=region, config=Config(**_settings(service)))
+
+def aio_client(session, service, region=None):
+    """Open an aioboto3 client with the same pool and retry settings as client()."""
+    from aiobotocore.config import AioConfig
+
+    return session.client(service, region_name=region, config=AioConfig(**_settings(service)))
+
+def supports_param(client, operation, param):
+    """Check whether the client's service model accepts a request parameter."""
+    input_shape = client.meta.service_model.operation_model(operation).input_shape
+    return input_shape is not None and param in input_shape.members
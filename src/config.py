@@ -23,17 +23,36 @@ class Config:
     AGENT_ROLE_NAME = os.getenv('AGENT_ROLE_NAME', 'AgentExecutionRole')
     
     # Model Configuration
+    # CreateAgent has no latency option; where the region offers one, point this
+    # at a latency-optimized inference profile ID instead
     FOUNDATION_MODEL = os.getenv('FOUNDATION_MODEL', 'anthropic.claude-3-5-sonnet-20240620-v1:0')
     EMBEDDING_MODEL_ARN = os.getenv('EMBEDDING_MODEL_ARN', 
                                   f'arn:aws:bedrock:{AWS_REGION}::foundation-model/amazon.titan-embed-text-v1')
     
     # Knowledge Base Configuration
     KB_NAME = os.getenv('KB_NAME', 'QuantumComputing-KnowledgeBase')
+    KB_COLLECTION_NAME = os.getenv('KB_COLLECTION_NAME', 'quantumviz-collection')
+    # Collections are billed while they exist, so setup only creates one on request
+    KB_CREATE_COLLECTION = os.getenv('KB_CREATE_COLLECTION', 'false').lower() == 'true'
+    # GPU-accelerated vector indexing for the collection (ENABLED / DISABLED)
+    KB_VECTOR_ACCELERATION = os.getenv('KB_VECTOR_ACCELERATION', 'ENABLED')
+    # Role Bedrock assumes to read the collection; granted data access to it
+    KB_ROLE_NAME = os.getenv('KB_ROLE_NAME', 'QuantumVizKnowledgeBaseRole')
+    # Optional VPC endpoint that may reach the collection besides Bedrock itself
+    KB_VPC_ENDPOINT_ID = os.getenv('KB_VPC_ENDPOINT_ID', '')
     KB_COLLECTION_ARN = os.getenv('KB_COLLECTION_ARN', 
                                 f'arn:aws:aoss:{AWS_REGION}:{AWS_ACCOUNT_ID}:collection/quantumviz-collection')
     
     # OpenSearch Configuration
     VECTOR_INDEX_NAME = os.getenv('VECTOR_INDEX_NAME', 'quantum-knowledge-index')
+    OPENSEARCH_COLLECTION_ENDPOINT = os.getenv('OPENSEARCH_COLLECTION_ENDPOINT', '')
+    
+    # Batch ingestion (OpenSearch Ingestion + Bedrock batch embeddings)
+    INGESTION_PIPELINE_NAME = os.getenv('INGESTION_PIPELINE_NAME', 'quantumviz-kb-ingestion')
+    INGESTION_ROLE_NAME = os.getenv('INGESTION_ROLE_NAME', 'QuantumVizIngestionRole')
+    KB_SOURCE_PREFIX = os.getenv('KB_SOURCE_PREFIX', 'knowledge/')
+    # ML Commons model (Bedrock connector to the embedding model) used by ml_inference
+    ML_COMMONS_MODEL_ID = os.getenv('ML_COMMONS_MODEL_ID', '')
     
     # S3 Configuration
     S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'quantumviz-agent-assets')
@@ -43,10 +62,20 @@ class Config:
         """Get the full ARN for the agent execution role."""
         return f'arn:aws:iam::{cls.AWS_ACCOUNT_ID}:role/{cls.AGENT_ROLE_NAME}'
     
+    @classmethod
+    def get_ingestion_role_arn(cls) -> str:
+        """Get the full ARN for the ingestion pipeline role."""
+        return f'arn:aws:iam::{cls.AWS_ACCOUNT_ID}:role/{cls.INGESTION_ROLE_NAME}'
+    
+    @classmethod
+    def get_kb_role_arn(cls) -> str:
+        """Get the full ARN for the knowledge base service role."""
+        return f'arn:aws:iam::{cls.AWS_ACCOUNT_ID}:role/{cls.KB_ROLE_NAME}'
+    
     @classmethod
     def get_kb_collection_arn(cls) -> str:
         """Get the full ARN for the knowledge base collection."""
-        return f'arn:aws:aoss:{cls.AWS_REGION}:{cls.AWS_ACCOUNT_ID}:collection/quantumviz-collection'
+        return f'arn:aws:aoss:{cls.AWS_REGION}:{cls.AWS_ACCOUNT_ID}:collection/{cls.KB_COLLECTION_NAME}'
     
     @classmethod
     def validate_config(cls) -> bool: